@@ -0,0 +1,189 @@
+# app/archive.py
+"""
+Uforanderlig arkiv for rå dagsfiler fra hvakosterstrommen.no.
+
+Publiserte dagspriser endres ikke, så rå JSON lagres én gang per (område,
+dato). Innholdet lagres gzip-komprimert og adressert med sha256 av råbytene
+(objects/ab/cdef....json.gz), og en SQLite-indeks peker fra (område, dato)
+til hashen. Like filer lagres bare én gang.
+
+Collectorene leser fra arkivet først og går bare mot nettet ved bom.
+`python -m app.archive replay` bygger spot_prices på nytt fra arkivet uten
+nettverk, f.eks. etter en rettelse i parse_payload.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional, Tuple
+
+RAW_ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", os.path.join("data", "raw"))
+
+_local = threading.local()
+
+
+def _index() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(RAW_ARCHIVE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(RAW_ARCHIVE_DIR, "index.sqlite"), timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS payloads ("
+            "area TEXT NOT NULL, date TEXT NOT NULL, sha256 TEXT NOT NULL, "
+            "size INTEGER NOT NULL, fetched_at TEXT NOT NULL, PRIMARY KEY (area, date))"
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(RAW_ARCHIVE_DIR, "objects", digest[:2], f"{digest[2:]}.json.gz")
+
+
+def get(area: str, d: date) -> Optional[bytes]:
+    """Rå JSON for området og datoen, eller None hvis den ikke er arkivert."""
+    row = _index().execute(
+        "SELECT sha256 FROM payloads WHERE area = ? AND date = ?", (area, d.isoformat())
+    ).fetchone()
+    if row is None:
+        return None
+    try:
+        with gzip.open(_object_path(row[0]), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def put(area: str, d: date, raw: bytes) -> str:
+    """Lagrer rå JSON og returnerer sha256. Skriver objektet atomisk før indeksen oppdateres."""
+    digest = hashlib.sha256(raw).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+    conn = _index()
+    conn.execute(
+        "INSERT OR REPLACE INTO payloads (area, date, sha256, size, fetched_at) VALUES (?, ?, ?, ?, ?)",
+        (area, d.isoformat(), digest, len(raw), datetime.now(timezone.utc).isoformat()),
+    )
+    conn.commit()
+    return digest
+
+
+def fetch_raw(area: str, d: date, url: str, timeout: int = 20) -> bytes:
+    """Henter rå JSON fra arkivet, ellers fra url. Ikke-tomme lister arkiveres."""
+    raw = get(area, d)
+    if raw is not None:
+        return raw
+
+    import requests
+
+    r = requests.get(url, timeout=timeout)
+    r.raise_for_status()
+    raw = r.content
+
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return raw
+    if isinstance(payload, list) and payload:
+        put(area, d, raw)
+    return raw
+
+
+def entries(
+    areas: Optional[list] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Iterator[Tuple[str, date]]:
+    """(område, dato) for arkiverte dager, sortert."""
+    sql = "SELECT area, date FROM payloads WHERE 1 = 1"
+    params: list = []
+    if areas:
+        sql += f" AND area IN ({', '.join('?' for _ in areas)})"
+        params.extend(areas)
+    if start:
+        sql += " AND date >= ?"
+        params.append(start.isoformat())
+    if end:
+        sql += " AND date <= ?"
+        params.append(end.isoformat())
+    sql += " ORDER BY area, date"
+    for area, d in _index().execute(sql, params).fetchall():
+        yield area, date.fromisoformat(d)
+
+
+def replay(areas: Optional[list] = None, start: Optional[date] = None, end: Optional[date] = None,
+           replace: bool = False) -> int:
+    """Bygger spot_prices fra arkivet. Med replace overskrives eksisterende rader."""
+    from .collector_db import bulk_insert, parse_payload
+    from .db import SessionLocal
+    from .migrations import ensure_partitions, partition_span
+
+    db = SessionLocal()
+    total = 0
+    try:
+        days = list(entries(areas, start, end))
+        if days:
+            first = min(d for _, d in days)
+            last = max(d for _, d in days)
+            ensure_partitions(db.connection(), *partition_span(first, last))
+            db.commit()
+
+        batch: list = []
+        for area, d in days:
+            batch.extend(parse_payload(area, json.loads(get(area, d) or b"[]")))
+            if len(batch) >= 5000:
+                total += bulk_insert(db, batch, replace=replace)
+                db.commit()
+                batch = []
+        if batch:
+            total += bulk_insert(db, batch, replace=replace)
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"Replay ferdig: {total} rader fra {len(days)} dager")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Arkiv for rå dagsfiler")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_replay = sub.add_parser("replay", help="bygg spot_prices fra arkivet uten nettverk")
+    p_replay.add_argument("--areas", default="all", help="kommaseparert liste eller 'all'")
+    p_replay.add_argument("--start", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    p_replay.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    p_replay.add_argument("--replace", action="store_true", help="overskriv eksisterende rader")
+
+    sub.add_parser("stats", help="vis antall arkiverte dager per område")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        areas = None if args.areas.lower() == "all" else [a.strip().upper() for a in args.areas.split(",")]
+        if replay(areas, args.start, args.end, args.replace):
+            from . import snapshot
+
+            snapshot.publish()
+    else:
+        for area, n, size in _index().execute(
+            "SELECT area, count(*), sum(size) FROM payloads GROUP BY area ORDER BY area"
+        ):
+            print(f"{area}: {n} dager, {size} bytes rå JSON")
+
+
+if __name__ == "__main__":
+    main()
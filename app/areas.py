@@ -0,0 +1,46 @@
+# app/areas.py
+from __future__ import annotations
+
+from typing import Iterable, List
+
+# Felles liste over prisområder. Modulen importerer ikke FastAPI ved import,
+# så collector, migreringer og modellkoden kan bruke den
+AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
+
+
+def parse_areas(values: Iterable[str]) -> List[str]:
+    """
+    Tolker area-parametere: gjentatte (?area=NO1&area=NO2), kommaseparerte
+    (?area=NO1,NO2) eller 'all'. Returnerer unike områder i rekkefølge.
+    """
+    from fastapi import HTTPException
+
+    areas: List[str] = []
+    for value in values:
+        for a in value.split(","):
+            a = a.upper().strip()
+            if not a:
+                continue
+            if a == "ALL":
+                return list(AREAS)
+            if a not in AREAS:
+                raise HTTPException(status_code=400, detail="Ugyldig område. Bruk NO1..NO5 eller all")
+            if a not in areas:
+                areas.append(a)
+
+    if not areas:
+        raise HTTPException(status_code=400, detail="Mangler område. Bruk NO1..NO5 eller all")
+    return areas
+
+
+def is_single_area(values: List[str]) -> bool:
+    """True når klienten ba om nøyaktig ett område; da beholdes det flate svarformatet."""
+    return len(values) == 1 and "," not in values[0] and values[0].strip().lower() != "all"
+
+
+def group_by_area(areas: List[str], rows: Iterable[dict]) -> dict:
+    """Grupperer rader (dicts med 'area') per område, i samme rekkefølge som areas."""
+    grouped: dict = {a: [] for a in areas}
+    for row in rows:
+        grouped[row["area"]].append(row)
+    return grouped
@@ -0,0 +1,254 @@
+# app/backfill.py
+"""
+Bulk-lasting av historikk med COPY og sjekkpunkter.
+
+Rader strømmes med `COPY ... FROM STDIN` inn i en midlertidig
+staging-tabell og flettes inn i spot_prices med én INSERT ... SELECT
+... ON CONFLICT per bit. Etter hver bit lagres et sjekkpunkt, så en
+avbrutt kjøring fortsetter der den stoppet. Bitene er idempotente.
+
+Kilder:
+    python -m app.backfill range --start 2021-01-01 --end 2025-12-31 [--areas NO1,NO2]
+    python -m app.backfill csv data/spotprices_NO1.csv data/spotprices_NO2.csv
+
+range henter dagsfiler via råarkivet (app/archive.py), og fra nettet
+parallelt bare for dager som ikke er arkivert. Mot andre databaser enn
+PostgreSQL brukes bulk_insert i stedet for COPY.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import snapshot
+from .collector_db import AREAS, bulk_insert, fetch_day, parse_dt, parse_payload
+from .db import SessionLocal, engine, libpq_dsn
+from .migrations import ensure_partitions, next_month, partition_span
+
+CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", os.path.join("data", "backfill_checkpoint.json"))
+
+COLUMNS = ("area", "date", "time_start", "time_end", "nok_per_kwh", "eur_per_kwh", "exr")
+
+# Rader per bit ved CSV-lasting
+CSV_CHUNK_ROWS = 50_000
+
+
+class Checkpoint:
+    """Fullførte biter per jobb, lagret atomisk som JSON."""
+
+    def __init__(self, path: str, job: str, restart: bool = False) -> None:
+        self.path = path
+        self.job = job
+        self.data: Dict[str, List[str]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        if restart:
+            self.data.pop(job, None)
+        self.done = set(self.data.get(job, []))
+
+    def mark(self, unit: str) -> None:
+        self.done.add(unit)
+        self.data[self.job] = sorted(self.done)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _ensure_partitions_for(rows: Sequence[Sequence[Any]]) -> None:
+    days = [r[1] for r in rows]
+    with engine.begin() as conn:
+        ensure_partitions(conn, *partition_span(min(days), max(days)))
+
+
+def load_rows(rows: Sequence[Sequence[Any]], replace: bool = False) -> int:
+    """Laster rader (tupler i COLUMNS-rekkefølge) i én transaksjon. Returnerer antall nye/endrede rader."""
+    if not rows:
+        return 0
+
+    if engine.dialect.name != "postgresql":
+        db = SessionLocal()
+        try:
+            n = bulk_insert(db, [dict(zip(COLUMNS, r)) for r in rows], replace=replace)
+            db.commit()
+            return n
+        finally:
+            db.close()
+
+    import psycopg
+
+    _ensure_partitions_for(rows)
+
+    cols = ", ".join(COLUMNS)
+    if replace:
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS if c not in ("area", "time_start"))
+        conflict = f"DO UPDATE SET {updates}"
+    else:
+        conflict = "DO NOTHING"
+
+    with psycopg.connect(libpq_dsn()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE spot_prices_staging ("
+                "area varchar(3), date date, time_start timestamptz, time_end timestamptz, "
+                "nok_per_kwh double precision, eur_per_kwh double precision, exr double precision"
+                ") ON COMMIT DROP"
+            )
+            with cur.copy(f"COPY spot_prices_staging ({cols}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cur.execute(
+                f"INSERT INTO spot_prices ({cols}) "
+                f"SELECT DISTINCT ON (area, time_start) {cols} FROM spot_prices_staging "
+                f"WHERE time_start IS NOT NULL AND time_end IS NOT NULL "
+                f"ORDER BY area, time_start "
+                f"ON CONFLICT (area, time_start) {conflict}"
+            )
+            n = cur.rowcount
+        conn.commit()
+    return n
+
+
+def _month_chunks(start: date, end: date) -> Iterator[tuple[date, date]]:
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield max(month, start), min(next_month(month) - timedelta(days=1), end)
+        month = next_month(month)
+
+
+def _fetch(area: str, d: date) -> Optional[List[Dict[str, Any]]]:
+    """Rader for dagen; [] når dagen ikke har data (tom liste eller 404), None ved feil."""
+    try:
+        return parse_payload(area, fetch_day(area, d))
+    except Exception as e:
+        if getattr(getattr(e, "response", None), "status_code", None) == 404:
+            return []
+        print(f"[{area}] {d}: feil: {e}")
+        return None
+
+
+def backfill_range(areas: List[str], start: date, end: date, checkpoint: Checkpoint,
+                   fetch_workers: int = 8, replace: bool = False) -> int:
+    """
+    Én bit per område og måned. Feiler en dag, lastes resten av måneden,
+    men biten markeres ikke som ferdig, så neste kjøring henter den igjen.
+    """
+    total = 0
+    incomplete = []
+    with ThreadPoolExecutor(max_workers=fetch_workers) as pool:
+        for area in areas:
+            for first, last in _month_chunks(start, end):
+                unit = f"{area}:{first:%Y-%m}"
+                if unit in checkpoint.done:
+                    continue
+
+                days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+                fetched = list(pool.map(lambda d: _fetch(area, d), days))
+                failed = [d for d, day_rows in zip(days, fetched) if day_rows is None]
+                rows = [tuple(r[c] for c in COLUMNS) for day_rows in fetched if day_rows for r in day_rows]
+
+                n = load_rows(rows, replace=replace)
+                total += n
+                if failed:
+                    incomplete.append(unit)
+                    print(f"[{area}] {first:%Y-%m}: {len(rows)} rader lest, +{n}, "
+                          f"{len(failed)} dager feilet (ikke markert ferdig)")
+                else:
+                    checkpoint.mark(unit)
+                    print(f"[{area}] {first:%Y-%m}: {len(rows)} rader lest, +{n}")
+
+    if incomplete:
+        print(f"Ufullstendige biter, kjør på nytt for å hente dem: {', '.join(incomplete)}")
+    return total
+
+
+def _csv_rows(path: str) -> Iterator[tuple]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            time_start, time_end = parse_dt(row.get("time_start")), parse_dt(row.get("time_end"))
+            if time_start is None or time_end is None or not row.get("nok_per_kwh"):
+                continue
+            yield (
+                row["area"],
+                date.fromisoformat(row["date"]),
+                time_start,
+                time_end,
+                float(row["nok_per_kwh"]),
+                float(row["eur_per_kwh"]) if row.get("eur_per_kwh") else None,
+                float(row["exr"]) if row.get("exr") else None,
+            )
+
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk: List[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def backfill_csv(paths: List[str], checkpoint: Checkpoint, replace: bool = False) -> int:
+    """Én bit per CSV_CHUNK_ROWS rader per fil."""
+    total = 0
+    for path in paths:
+        for i, rows in enumerate(_chunks(_csv_rows(path), CSV_CHUNK_ROWS)):
+            unit = f"{os.path.abspath(path)}:{i}"
+            if unit in checkpoint.done:
+                continue
+            n = load_rows(rows, replace=replace)
+            checkpoint.mark(unit)
+            total += n
+            print(f"{path} #{i}: {len(rows)} rader lest, +{n}")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-lasting av historikk med sjekkpunkter")
+    parser.add_argument("--replace", action="store_true", help="overskriv eksisterende rader")
+    parser.add_argument("--restart", action="store_true", help="ignorer tidligere sjekkpunkt for jobben")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    sub = parser.add_subparsers(dest="source", required=True)
+
+    p_range = sub.add_parser("range", help="hent et datointervall (via råarkivet)")
+    p_range.add_argument("--start", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    p_range.add_argument("--end", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD")
+    p_range.add_argument("--areas", default="all", help="kommaseparert liste eller 'all'")
+    p_range.add_argument("--fetch-workers", type=int, default=8)
+
+    p_csv = sub.add_parser("csv", help="last CSV-filer fra collector.py")
+    p_csv.add_argument("paths", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.source == "range":
+        areas = AREAS if args.areas.lower() == "all" else [a.strip().upper() for a in args.areas.split(",")]
+        job = f"range:{','.join(areas)}:{args.start}:{args.end}"
+        checkpoint = Checkpoint(args.checkpoint, job, args.restart)
+        total = backfill_range(areas, args.start, args.end, checkpoint, args.fetch_workers, args.replace)
+    else:
+        job = "csv:" + ",".join(sorted(os.path.abspath(p) for p in args.paths))
+        checkpoint = Checkpoint(args.checkpoint, job, args.restart)
+        total = backfill_csv(args.paths, checkpoint, args.replace)
+
+    print(f"Ferdig: +{total} rader")
+    if total:
+        snapshot.publish()
+
+
+if __name__ == "__main__":
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL mangler")
+
+    main()
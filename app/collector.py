@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import csv
+import json
 import os
 from dataclasses import dataclass
 from datetime import date, timedelta
@@ -8,6 +9,8 @@ from typing import Iterable, List, Dict, Any
 
 import requests
 
+from . import archive
+
 
 AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
 
@@ -27,9 +30,8 @@ def fetch_day(area: str, d: date) -> List[Dict[str, Any]]:
     # API bruker format: YYYY/MM-DD_NO1.json (merk slash)
     date_str = d.strftime("%Y/%m-%d")
     url = f"https://www.hvakosterstrommen.no/api/v1/prices/{date_str}_{area}.json"
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    # Leser fra råarkivet først; publiserte dager endres ikke
+    return json.loads(archive.fetch_raw(area, d, url, timeout=20))
 
 
 def normalize(area: str, payload: List[Dict[str, Any]]) -> List[PriceRow]:
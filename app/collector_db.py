@@ -1,28 +1,29 @@
 from __future__ import annotations
 
+import json
 import os
 from datetime import date, datetime, timedelta
 from typing import Any, Dict, List
 
-import requests
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
+from . import archive, snapshot
+from .areas import AREAS
 from .db import SessionLocal
+from .events import notify_new_day
+from .migrations import ensure_partitions, partition_span
 from .models_db import SpotPrice
 
 
-AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
-
-
 def hvakoster_url(area: str, d: date) -> str:
     return f"https://www.hvakosterstrommen.no/api/v1/prices/{d.strftime('%Y/%m-%d')}_{area}.json"
 
 
 def fetch_day(area: str, d: date) -> List[Dict[str, Any]]:
-    r = requests.get(hvakoster_url(area, d), timeout=20)
-    r.raise_for_status()
-    return r.json() if isinstance(r.json(), list) else []
+    # Leser fra råarkivet først; publiserte dager endres ikke
+    payload = json.loads(archive.fetch_raw(area, d, hvakoster_url(area, d), timeout=20))
+    return payload if isinstance(payload, list) else []
 
 
 def parse_dt(value: str | None) -> datetime | None:
@@ -34,8 +35,8 @@ def parse_dt(value: str | None) -> datetime | None:
         return None
 
 
-def normalize_rows(area: str, payload: List[Dict[str, Any]]) -> List[SpotPrice]:
-    rows: List[SpotPrice] = []
+def parse_payload(area: str, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
 
     for item in payload:
         ts = parse_dt(item.get("time_start"))
@@ -50,7 +51,7 @@ def normalize_rows(area: str, payload: List[Dict[str, Any]]) -> List[SpotPrice]:
             continue
 
         rows.append(
-            SpotPrice(
+            dict(
                 area=area,
                 date=ts.date(),
                 time_start=ts,
@@ -64,8 +65,42 @@ def normalize_rows(area: str, payload: List[Dict[str, Any]]) -> List[SpotPrice]:
     return rows
 
 
+def normalize_rows(area: str, payload: List[Dict[str, Any]]) -> List[SpotPrice]:
+    return [SpotPrice(**row) for row in parse_payload(area, payload)]
+
+
+def bulk_insert(db, rows: List[Dict[str, Any]], replace: bool = False) -> int:
+    """
+    Setter inn rader (fra parse_payload) i én INSERT ... ON CONFLICT.
+    Med replace oppdateres eksisterende rader, ellers hoppes de over.
+    """
+    if not rows:
+        return 0
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"bulk_insert støtter ikke {dialect}")
+
+    stmt = insert(SpotPrice)
+    if replace:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["area", "time_start"],
+            set_={c: stmt.excluded[c] for c in ("date", "time_end", "nok_per_kwh", "eur_per_kwh", "exr")},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["area", "time_start"])
+
+    result = db.execute(stmt, rows)
+    # Noen drivere rapporterer ikke rowcount for executemany
+    return result.rowcount if result.rowcount >= 0 else len(rows)
+
+
 def exists(db, area: str, time_start: datetime) -> bool:
-    stmt = select(SpotPrice.id).where(
+    stmt = select(SpotPrice.time_start).where(
         SpotPrice.area == area,
         SpotPrice.time_start == time_start,
     )
@@ -95,15 +130,20 @@ def insert_day(db, area: str, d: date) -> tuple[int, int]:
     return added, skipped
 
 
-def collect_area(area: str, start: date, end: date):
+def collect_area(area: str, start: date, end: date, publish: bool = True):
     db = SessionLocal()
     total_added = total_skipped = 0
 
     try:
+        ensure_partitions(db.connection(), *partition_span(start, end), areas=[area])
+        db.commit()
+
         cur = start
         while cur <= end:
             try:
                 a, s = insert_day(db, area, cur)
+                if a:
+                    notify_new_day(db, area, cur, a)
                 db.commit()
                 total_added += a
                 total_skipped += s
@@ -119,14 +159,26 @@ def collect_area(area: str, start: date, end: date):
         db.close()
 
     print(f"Ferdig {area}: +{total_added}, skipped {total_skipped}")
+    if publish and total_added:
+        _publish_snapshot()
+
+
+def _publish_snapshot() -> None:
+    # Workerne leser nylige priser fra snapshotet, se app/snapshot.py
+    try:
+        snapshot.publish()
+    except Exception as e:
+        print(f"[snapshot] publisering feilet: {e}")
 
 
 def collect_all(days: int = 30):
     end = date.today()
     start = end - timedelta(days=days - 1)
 
+    # Ett snapshot etter alle områdene i stedet for ett per område
     for area in AREAS:
-        collect_area(area, start, end)
+        collect_area(area, start, end, publish=False)
+    _publish_snapshot()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+# app/compare_api.py
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .areas import parse_areas
+from .db import get_db
+from .models.evaluator import compare_models
+from .models.pool import PoolBusy
+from .models.registry import get_model, list_models
+from .profiling import start_timings, timed_response
+
+router = APIRouter(tags=["models"])
+
+
+@router.get("/compare")
+def compare(
+    model: List[str] = Query([], description="Modell-id. Kan gjentas; standard er alle registrerte"),
+    area: List[str] = Query(["NO1"], description="NO1..NO5 eller 'all'. Kan gjentas"),
+    d: Optional[date] = Query(None, alias="date", description="YYYY-MM-DD, standard i dag (UTC)"),
+    db: Session = Depends(get_db),
+):
+    timings = start_timings()
+    areas = parse_areas(area)
+
+    model_ids = [m.strip().lower() for value in model for m in value.split(",") if m.strip()]
+    model_ids = list(dict.fromkeys(model_ids)) or [m.model_id for m in list_models()]
+    for model_id in model_ids:
+        try:
+            get_model(model_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    day = d or datetime.now(timezone.utc).date()
+    try:
+        return timed_response(compare_models(db, model_ids, areas, day), timings)
+    except PoolBusy:
+        raise
+    except Exception as e:
+        return timed_response({"status": "error", "detail": str(e)}, timings)
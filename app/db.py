@@ -16,6 +16,10 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def libpq_dsn() -> str:
+    """DATABASE_URL uten SQLAlchemy-driverprefiks, for direkte psycopg-tilkoblinger (LISTEN, COPY)."""
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,162 @@
+# app/events.py
+"""
+Push av nye priser til klienter (server-sent events).
+
+collector_db sender en Postgres NOTIFY på kanalen spot_prices når en ny
+område-dag er lagret (levert ved commit). Hver worker har én lytter-tråd
+med LISTEN som videresender til en in-process broker, som igjen fordeler
+til SSE-abonnentene per område.
+
+Mot andre databaser (f.eks. SQLite lokalt) publiseres hendelsen direkte
+i prosessen etter commit.
+
+Hver hendelse melder også området som endret til prissnapshotet
+(app/snapshot.py), så workeren ikke leser utdaterte priser derfra.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .db import libpq_dsn
+
+CHANNEL = "spot_prices"
+
+# Maks antall hendelser som venter per klient før de forkastes
+_QUEUE_SIZE = 100
+
+# Nøkler i Session.info for hendelser som venter på commit (andre databaser enn Postgres)
+_PENDING = "spot_prices_pending_events"
+_LISTENING = "spot_prices_listening"
+
+
+class Broker:
+    """Fordeler hendelser til asyncio-køer for abonnentene i denne workeren."""
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[Tuple[asyncio.Queue, frozenset]] = set()
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, areas: List[str]) -> Tuple[asyncio.Queue, frozenset]:
+        sub = (asyncio.Queue(maxsize=_QUEUE_SIZE), frozenset(areas))
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Tuple[asyncio.Queue, frozenset]) -> None:
+        self._subscribers.discard(sub)
+
+    def publish(self, payload: Dict[str, Any]) -> None:
+        """Kalles fra event-loopen."""
+        for queue, areas in list(self._subscribers):
+            if payload.get("area") in areas:
+                try:
+                    queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    pass
+
+    def publish_threadsafe(self, payload: Dict[str, Any]) -> None:
+        """Kalles fra andre tråder (lytteren, collectoren)."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, payload)
+
+
+broker = Broker()
+
+
+def _on_new_day(payload: Dict[str, Any]) -> None:
+    from . import snapshot
+
+    snapshot.mark_changed(payload.get("area"))
+    broker.publish_threadsafe(payload)
+
+
+def _publish_pending(session: Session) -> None:
+    for payload in session.info.pop(_PENDING, []):
+        _on_new_day(payload)
+
+
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def notify_new_day(db: Session, area: str, d: date, added: int) -> None:
+    """Melder at en område-dag har fått nye rader. Må kalles før db.commit()."""
+    payload = {"area": area, "date": d.isoformat(), "rows": added}
+
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:c, :p)"), {"c": CHANNEL, "p": orjson.dumps(payload).decode()})
+        return
+
+    # Som NOTIFY: hendelsen leveres bare hvis transaksjonen committes, og
+    # forkastes ved rollback så den ikke følger med neste commit
+    if not db.info.get(_LISTENING):
+        event.listen(db, "after_commit", _publish_pending)
+        event.listen(db, "after_rollback", _drop_pending)
+        db.info[_LISTENING] = True
+    db.info.setdefault(_PENDING, []).append(payload)
+
+
+class Listener(threading.Thread):
+    """Én LISTEN-tilkobling per worker. Kobler til på nytt ved feil."""
+
+    def __init__(self) -> None:
+        super().__init__(name="spot-prices-listener", daemon=True)
+        self._dsn = libpq_dsn()
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def run(self) -> None:
+        import psycopg
+
+        from . import snapshot
+
+        reconnect = False
+        while not self._stopping.is_set():
+            try:
+                with psycopg.connect(self._dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    if reconnect:
+                        # Varsler kan ha gått tapt mens lytteren var nede
+                        snapshot.mark_changed()
+                    while not self._stopping.is_set():
+                        for n in conn.notifies(timeout=5.0):
+                            _on_new_day(orjson.loads(n.payload))
+            except Exception as e:
+                print(f"[events] lytter feilet: {e}")
+                reconnect = True
+                self._stopping.wait(5.0)
+
+
+_listener: Optional[Listener] = None
+
+
+def start(engine: Engine, loop: asyncio.AbstractEventLoop) -> None:
+    global _listener
+    broker.bind(loop)
+    if engine.dialect.name == "postgresql" and _listener is None:
+        _listener = Listener()
+        _listener.start()
+
+
+def stop() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def format_sse(payload: Dict[str, Any], event_name: str = "prices") -> bytes:
+    return b"event: " + event_name.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
@@ -0,0 +1,46 @@
+# app/events_api.py
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from .areas import parse_areas
+from .events import broker, format_sse
+
+router = APIRouter(tags=["events"])
+
+# Sekunder mellom keep-alive-kommentarer, så proxyer ikke lukker strømmen
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("/events/prices")
+async def price_events(
+    request: Request,
+    area: List[str] = Query(["all"], description="NO1..NO5, kommaseparert/gjentatt, eller 'all'"),
+):
+    """Server-sent events: 'prices' sendes når nye priser for et område og en dag er lagret."""
+    areas = parse_areas(area)
+
+    async def stream():
+        sub = broker.subscribe(areas)
+        queue = sub[0]
+        try:
+            yield b": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield format_sse(payload)
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,57 +2,74 @@
 from __future__ import annotations
 
 from datetime import datetime, date as dt_date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, Query, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, select
 
+from .areas import group_by_area, is_single_area, parse_areas
 from .db import get_db
 from .models_db import SpotPrice
+from .serialization import IsoformatJSONResponse, json_response, rows_response, rows_to_dicts
 
 router = APIRouter(tags=["history"])
 
-AREAS = {"NO1", "NO2", "NO3", "NO4", "NO5"}
-
 def _parse_date(s: str) -> dt_date:
     return datetime.strptime(s, "%Y-%m-%d").date()
 
-@router.get("/spotprices/history")
+HISTORY_KEYS = ("area", "date", "time_start", "time_end", "NOK_per_kWh", "EUR_per_kWh", "EXR")
+
+
+@router.get("/spotprices/history", response_model=Union[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]])
 def spotprices_history(
-    area: str = Query(..., description="NO1..NO5"),
+    area: List[str] = Query(..., description="NO1..NO5, kommaseparert/gjentatt, eller 'all'"),
     start: Optional[str] = Query(None, description="YYYY-MM-DD"),
     end: Optional[str] = Query(None, description="YYYY-MM-DD"),
-    limit: int = Query(5000, ge=1, le=20000),
+    limit: int = Query(5000, ge=1, le=20000, description="Maks antall rader per område"),
     db: Session = Depends(get_db),
-) -> List[Dict[str, Any]]:
-    area = area.upper().strip()
-    if area not in AREAS:
-        raise HTTPException(status_code=400, detail="Ugyldig område. Bruk NO1..NO5")
+) -> ORJSONResponse:
+    areas = parse_areas(area)
+    single = is_single_area(area)
 
     start_d = _parse_date(start) if start else None
     end_d = _parse_date(end) if end else None
 
-    stmt = select(SpotPrice).where(SpotPrice.area == area)
+    columns = (
+        SpotPrice.area,
+        SpotPrice.date,
+        SpotPrice.time_start,
+        SpotPrice.time_end,
+        SpotPrice.nok_per_kwh,
+        SpotPrice.eur_per_kwh,
+        SpotPrice.exr,
+    )
+
+    if single:
+        stmt = select(*columns).where(SpotPrice.area == areas[0])
+    else:
+        # Grense per område med row_number(), alle områdene i én spørring
+        rn = func.row_number().over(
+            partition_by=SpotPrice.area, order_by=SpotPrice.time_start.asc()
+        ).label("rn")
+        stmt = select(*columns, rn).where(SpotPrice.area.in_(areas))
 
     if start_d:
         stmt = stmt.where(SpotPrice.date >= start_d)
     if end_d:
         stmt = stmt.where(SpotPrice.date <= end_d)
 
-    stmt = stmt.order_by(SpotPrice.time_start.asc()).limit(limit)
-
-    rows = db.execute(stmt).scalars().all()
-
-    return [
-        {
-            "area": r.area,
-            "date": r.date.isoformat(),
-            "time_start": r.time_start.isoformat(),
-            "time_end": r.time_end.isoformat(),
-            "NOK_per_kWh": r.nok_per_kwh,
-            "EUR_per_kWh": r.eur_per_kwh,
-            "EXR": r.exr,
-        }
-        for r in rows
-    ]
\ No newline at end of file
+    if single:
+        stmt = stmt.order_by(SpotPrice.time_start.asc()).limit(limit)
+        # Samme datetime-format som før (isoformat), se app/serialization.py
+        return rows_response(HISTORY_KEYS, db.execute(stmt).all(), IsoformatJSONResponse)
+
+    sub = stmt.subquery()
+    stmt = (
+        select(*(sub.c[c.key] for c in columns))
+        .where(sub.c.rn <= limit)
+        .order_by(sub.c.area.asc(), sub.c.time_start.asc())
+    )
+    rows = rows_to_dicts(HISTORY_KEYS, db.execute(stmt).all())
+    return json_response(group_by_area(areas, rows), response_class=IsoformatJSONResponse)
@@ -1,15 +1,25 @@
 from datetime import datetime, timedelta
 from typing import Dict, List
-from fastapi import FastAPI, Depends, Query
+import os
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from .nve_fetcher import fetch_nve_prices
 from .history_api import router as history_router
-from .db import Base, engine, get_db
-from app.models.xgboost_model import predict_xgboost
-from app.models.baseline import predict_baseline
+from .db import engine, get_db
+from .migrations import migrate
+from app.models.registry import get_model, list_models, warm_up
+from app.models import pool as training_pool
+from app.models.pool import PoolBusy
 from app.models.evaluator import evaluate_model
 from .spot_api import router as spot_router
+from .optimize_api import router as optimize_router
+from .compare_api import router as compare_router
+from .events_api import router as events_router
+from . import events
+from .profiling import ProfilingMiddleware, start_timings, timed_response
+from .ratelimit import RateLimitMiddleware
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
@@ -18,8 +28,13 @@ app = FastAPI(
     title="Forecast24 API",
     description="Backend-API for Forecast24",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Kostnadsbasert rate limiting, se app/ratelimit.py. Legges til før CORS,
+# slik at også 429-svarene får CORS-headere
+app.add_middleware(RateLimitMiddleware, engine=engine)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -34,17 +49,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in profilering med X-Profile-header, se app/profiling.py
+app.add_middleware(ProfilingMiddleware)
+
 # ALT under /api
 app.include_router(history_router, prefix="/api")
 app.include_router(spot_router)
+app.include_router(optimize_router, prefix="/api")
+app.include_router(compare_router, prefix="/api")
+app.include_router(events_router, prefix="/api")
 
 @app.on_event("startup")
 async def on_startup():
-    Base.metadata.create_all(bind=engine)
+    migrate(engine)
     loop = asyncio.get_event_loop()
+    events.start(engine, loop)
     executor = ThreadPoolExecutor(max_workers=1)
     loop.run_in_executor(executor, lambda: __import__('app.collector_db', fromlist=['collect_all']).collect_all(days=30))
 
+    # MODEL_WARMUP=all eller f.eks. "xgboost,baseline": last modellene i bakgrunnen etter oppstart
+    warmup = os.getenv("MODEL_WARMUP", "").strip()
+    if warmup:
+        ids = None if warmup.lower() == "all" else [m.strip() for m in warmup.split(",") if m.strip()]
+        loop.run_in_executor(None, warm_up, ids)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    training_pool.shutdown()
+    events.stop()
+
+@app.exception_handler(PoolBusy)
+async def pool_busy_handler(request: Request, exc: PoolBusy):
+    return ORJSONResponse(
+        status_code=503,
+        content={"status": "busy", "detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/api/health")
 def health_check():
     return {
@@ -107,21 +148,20 @@ def get_spotprices(area: str = "NO1"):
 
 #models
 
-@app.get("/api/forecast/baseline")
-def get_forecast_baseline(
-        area: str = Query("NO1", description="NO1..NO5"),
-        db: Session = Depends(get_db),
-) -> Dict:
-    area = area.upper().strip()
-    points = predict_baseline(db, area)
+@app.get("/api/models")
+def get_models() -> Dict:
+    return {"models": [m.info() for m in list_models()]}
+
 
+def _forecast_response(model_id: str, area: str, points: List[Dict], **extra) -> Dict:
     valid = [p for p in points if p["price_nok_per_kwh"] is not None]
     prices = [p["price_nok_per_kwh"] for p in valid]
 
     if not prices:
         return {
             "status": "no_data",
-            "model": "baseline",
+            "model": model_id,
+            **extra,
             "area": area,
             "points": points,
             "summary": None,
@@ -133,7 +173,8 @@ def get_forecast_baseline(
 
     return {
         "status": "ok",
-        "model": "baseline",
+        "model": model_id,
+        **extra,
         "area": area,
         "generated_at": now.isoformat() + "Z",
         "summary": {
@@ -151,43 +192,59 @@ def get_forecast_baseline(
         "points": points,
     }
 
-@app.get("/api/forecast/xgboost")
-def get_forecast_xgboost(
+
+@app.get("/api/forecast/baseline")
+def get_forecast_baseline(
+        area: str = Query("NO1", description="NO1..NO5 eller 'all'"),
+        variant: str = Query("mean", description="mean, median, weekday eller ewm"),
+        db: Session = Depends(get_db),
+) -> Dict:
+    timings = start_timings()
+    area = area.upper().strip()
+    variant = variant.lower().strip()
+    baseline = get_model("baseline").load()
+    if variant not in baseline.VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Ukjent variant. Bruk {', '.join(baseline.VARIANTS)}")
+
+    if area == "ALL":
+        forecasts = baseline.predict_baseline_all(db, variant)
+        return timed_response({
+            "status": "ok",
+            "model": "baseline",
+            "variant": variant,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "areas": {
+                a: _forecast_response("baseline", a, points, variant=variant)
+                for a, points in forecasts.items()
+            },
+        }, timings)
+
+    points = baseline.predict_baseline(db, area, variant)
+    return timed_response(_forecast_response("baseline", area, points, variant=variant), timings)
+
+
+@app.get("/api/forecast/{model_id}")
+def get_forecast_model(
+        model_id: str,
         area: str = Query("NO1", description="NO1..NO5"),
         db: Session = Depends(get_db),
 ) -> Dict:
+    timings = start_timings()
     area = area.upper().strip()
 
     try:
-        points = predict_xgboost(db, area)
-    except Exception as e:
-        return {"status": "error", "model": "xgboost", "area": area, "detail": str(e)}
+        model = get_model(model_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    valid = [p for p in points if p["price_nok_per_kwh"] is not None]
-    prices = [p["price_nok_per_kwh"] for p in valid]
-    cheapest = min(valid, key=lambda p: p["price_nok_per_kwh"])
-    priciest = max(valid, key=lambda p: p["price_nok_per_kwh"])
-    now = datetime.utcnow()
+    try:
+        points = model.forecast_fn()(db, area)
+    except PoolBusy:
+        raise
+    except Exception as e:
+        return timed_response({"status": "error", "model": model_id, "area": area, "detail": str(e)}, timings)
 
-    return {
-        "status": "ok",
-        "model": "xgboost",
-        "area": area,
-        "generated_at": now.isoformat() + "Z",
-        "summary": {
-            "currency": "NOK",
-            "unit": "kr/kWh",
-            "horizon_hours": 24,
-            "min_price": min(prices),
-            "max_price": max(prices),
-            "avg_price": round(sum(prices) / len(prices), 4),
-            "cheapest_hour": cheapest["hour"],
-            "cheapest_timestamp": cheapest["timestamp"],
-            "priciest_hour": priciest["hour"],
-            "priciest_timestamp": priciest["timestamp"],
-        },
-        "points": points,
-    }
+    return timed_response(_forecast_response(model_id, area, points), timings)
 
 
 @app.get("/api/evaluate/{model_id}")
@@ -196,8 +253,11 @@ def get_model_evaluation(
         area: str = Query("NO1", description="NO1..NO5"),
         db: Session = Depends(get_db),
 ) -> Dict:
+    timings = start_timings()
     area = area.upper().strip()
     try:
-        return evaluate_model(db, model_id, area)
+        return timed_response(evaluate_model(db, model_id, area), timings)
+    except PoolBusy:
+        raise
     except Exception as e:
-        return {"status": "error", "detail": str(e)}
+        return timed_response({"status": "error", "detail": str(e)}, timings)
@@ -0,0 +1,135 @@
+# app/migrate_online.py
+"""
+Flytter data fra den gamle, upartisjonerte spot_prices-tabellen over i
+spot_prices_partitioned mens API-et og collectoren kjører videre.
+
+1. Kopierer én måned per område om gangen i korte transaksjoner.
+2. Låser den gamle tabellen for skriving (lesing går fortsatt), kopierer
+   alle rader som mangler i den nye tabellen og bytter navn i samme
+   transaksjon. Sammenligningen går på (area, time_start) og ikke på id:
+   en transaksjon kan ha fått en id under høyeste id ved start, men
+   committet etter at måneden var kopiert.
+
+Kjøres med:
+    python -m app.migrate_online [--drop-legacy]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+from sqlalchemy import text
+
+from .areas import AREAS
+from .db import engine
+from .migrations import (
+    SHADOW_TABLE,
+    TABLE,
+    next_month,
+    ensure_partitions,
+    partition_span,
+    is_partitioned,
+    migrate,
+    table_exists,
+)
+
+LEGACY_TABLE = "spot_prices_legacy"
+
+COLUMNS = "area, date, time_start, time_end, nok_per_kwh, eur_per_kwh, exr"
+
+
+def _copy(conn, where: str, params: dict) -> int:
+    result = conn.execute(
+        text(
+            f"INSERT INTO {SHADOW_TABLE} ({COLUMNS}) "
+            f"SELECT {COLUMNS} FROM {TABLE} WHERE {where} "
+            f"ON CONFLICT (area, time_start) DO NOTHING"
+        ),
+        params,
+    )
+    return result.rowcount
+
+
+def copy_batches() -> int:
+    """Kopierer alle rader opp til høyeste id ved start. Returnerer den id-en."""
+    with engine.connect() as conn:
+        max_id, first, last = conn.execute(
+            text(f"SELECT max(id), min(time_start)::date, max(time_start)::date FROM {TABLE}")
+        ).one()
+
+    if max_id is None:
+        return 0
+
+    with engine.begin() as conn:
+        ensure_partitions(conn, *partition_span(first, last), parent=SHADOW_TABLE)
+
+    for area in AREAS:
+        month = first.replace(day=1)
+        while month <= last:
+            nxt = next_month(month)
+            with engine.begin() as conn:
+                n = _copy(
+                    conn,
+                    "area = :a AND time_start >= :s AND time_start < :e AND id <= :max_id",
+                    {"a": area, "s": month, "e": nxt, "max_id": max_id},
+                )
+            print(f"[{area}] {month:%Y-%m}: +{n}")
+            month = nxt
+
+    return max_id
+
+
+def swap() -> None:
+    """Tar igjen rader som mangler etter kopieringen og bytter tabellene atomisk."""
+    with engine.begin() as conn:
+        conn.execute(text(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE"))
+
+        first, last = conn.execute(
+            text(f"SELECT min(time_start)::date, max(time_start)::date FROM {TABLE}")
+        ).one()
+        if first is not None:
+            ensure_partitions(conn, *partition_span(first, last), parent=SHADOW_TABLE)
+            n = _copy(
+                conn,
+                f"NOT EXISTS (SELECT 1 FROM {SHADOW_TABLE} s "
+                f"WHERE s.area = {TABLE}.area AND s.time_start = {TABLE}.time_start)",
+                {},
+            )
+            print(f"Tok igjen {n} rader")
+
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}"))
+        conn.execute(text(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {TABLE}"))
+        for area in AREAS:
+            conn.execute(text(f"ALTER TABLE {SHADOW_TABLE}_{area.lower()} RENAME TO {TABLE}_{area.lower()}"))
+
+    print(f"{TABLE} er nå partisjonert. Gammel tabell: {LEGACY_TABLE}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flytt spot_prices til partisjonert tabell uten nedetid")
+    parser.add_argument("--drop-legacy", action="store_true", help=f"slett {LEGACY_TABLE} etter bytte")
+    args = parser.parse_args()
+
+    migrate(engine)
+
+    with engine.connect() as conn:
+        if is_partitioned(conn, TABLE):
+            print(f"{TABLE} er allerede partisjonert")
+            return
+        if not table_exists(conn, SHADOW_TABLE):
+            raise RuntimeError(f"{SHADOW_TABLE} mangler")
+
+    copy_batches()
+    swap()
+
+    if args.drop_legacy:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        print(f"Slettet {LEGACY_TABLE}")
+
+
+if __name__ == "__main__":
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL mangler")
+
+    main()
@@ -0,0 +1,198 @@
+# app/migrations.py
+"""
+Enkel versjonsstyrt migrering av databaseskjemaet.
+
+Migreringene kjøres ved oppstart under en advisory lock, slik at flere
+workere ikke migrerer samtidig. Utførte versjoner lagres i schema_migrations.
+
+spot_prices er partisjonert per område (LIST) og per måned (RANGE på
+time_start). Månedspartisjoner opprettes ved behov med ensure_partitions.
+Finnes det allerede en gammel, upartisjonert spot_prices-tabell, opprettes
+den nye tabellen som spot_prices_partitioned ved siden av, og data flyttes
+over med `python -m app.migrate_online`.
+
+Mot andre databaser enn PostgreSQL (f.eks. SQLite lokalt) brukes create_all.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .areas import AREAS
+
+TABLE = "spot_prices"
+SHADOW_TABLE = "spot_prices_partitioned"
+
+# Vilkårlig, fast nøkkel for pg_advisory_lock
+_LOCK_KEY = 240024
+
+# Hvor mange måneder frem i tid partisjoner opprettes ved migrering
+_MONTHS_AHEAD = 2
+
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def next_month(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def _utc(d: date) -> str:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc).isoformat()
+
+
+def partition_name(area: str, month: date) -> str:
+    return f"spot_prices_{area.lower()}_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection, table: str = TABLE) -> bool:
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+             "WHERE c.relname = :t AND pg_table_is_visible(c.oid))"),
+        {"t": table},
+    ).scalar())
+
+
+def table_exists(conn: Connection, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table}).scalar()
+
+
+def partitioned_table(conn: Connection) -> str:
+    """Navnet på den partisjonerte tabellen (spot_prices, eller skyggetabellen før bytte)."""
+    return TABLE if is_partitioned(conn, TABLE) else SHADOW_TABLE
+
+
+def partition_span(first_day: date, last_day: date) -> tuple[date, date]:
+    """
+    Intervallet ensure_partitions må dekke for rader med dato i [first_day, last_day].
+
+    Datoene er norske, mens partisjonene har månedsgrenser i UTC: første time
+    1. mars starter 28. februar kl. 23:00 UTC. Derfor én dags margin på hver side.
+    """
+    return first_day - timedelta(days=1), last_day + timedelta(days=1)
+
+
+def partition_months(start: date, end: date) -> list[date]:
+    """Første dag i hver måned som overlapper [start, end]."""
+    months = []
+    month = _month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def ensure_partitions(conn: Connection, start: date, end: date, areas: list[str] | None = None,
+                      parent: str | None = None) -> None:
+    """Oppretter månedspartisjoner som dekker [start, end] for områdene, hvis de mangler."""
+    if conn.dialect.name != "postgresql":
+        return
+    parent = parent or partitioned_table(conn)
+
+    for area in areas or AREAS:
+        for month in partition_months(start, end):
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(area, month)} "
+                f"PARTITION OF {parent}_{area.lower()} "
+                f"FOR VALUES FROM ('{_utc(month)}') TO ('{_utc(next_month(month))}')"
+            ))
+
+
+def _ensure_upcoming(conn: Connection, parent: str | None = None) -> None:
+    """Inneværende måned og _MONTHS_AHEAD måneder frem."""
+    today = datetime.now(timezone.utc).date()
+    ahead = today
+    for _ in range(_MONTHS_AHEAD):
+        ahead = next_month(ahead)
+    ensure_partitions(conn, today, ahead, parent=parent)
+
+
+def _create_partitioned(conn: Connection, name: str) -> None:
+    conn.execute(text(f"""
+        CREATE TABLE {name} (
+            area        varchar(3)  NOT NULL,
+            date        date        NOT NULL,
+            time_start  timestamptz NOT NULL,
+            time_end    timestamptz NOT NULL,
+            nok_per_kwh double precision,
+            eur_per_kwh double precision,
+            exr         double precision,
+            -- INCLUDE gir index-only scans for pris-serier og /spot/latest
+            -- uten en egen B-tre på de samme kolonnene (PostgreSQL 11+)
+            CONSTRAINT spot_prices_pk PRIMARY KEY (area, time_start) INCLUDE (nok_per_kwh)
+        ) PARTITION BY LIST (area)
+    """))
+    for area in AREAS:
+        conn.execute(text(
+            f"CREATE TABLE {name}_{area.lower()} PARTITION OF {name} "
+            f"FOR VALUES IN ('{area}') PARTITION BY RANGE (time_start)"
+        ))
+
+    # Dekker (area, date)-oppslagene i /spot og historikk
+    conn.execute(text(f"CREATE INDEX ix_spot_prices_area_day ON {name} (area, date)"))
+    # Liten BRIN-indeks for rene tidsintervall-skann på tvers av områder
+    conn.execute(text(f"CREATE INDEX ix_spot_prices_time_start_brin ON {name} USING brin (time_start)"))
+
+
+def _m0001_partitioned_spot_prices(conn: Connection) -> None:
+    if table_exists(conn, TABLE) and not is_partitioned(conn, TABLE):
+        # Gammel heap-tabell: bygg den nye ved siden av, data flyttes med migrate_online
+        _create_partitioned(conn, SHADOW_TABLE)
+        parent = SHADOW_TABLE
+    else:
+        if not table_exists(conn, TABLE):
+            _create_partitioned(conn, TABLE)
+        parent = TABLE
+
+    _ensure_upcoming(conn, parent)
+
+
+def _m0002_rate_limit_buckets(conn: Connection) -> None:
+    # Delt tilstand for rate limiting (app/ratelimit.py). UNLOGGED: tapes ved krasj, men det er greit
+    conn.execute(text(
+        "CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets ("
+        "key text PRIMARY KEY, tokens double precision NOT NULL, "
+        "updated_at double precision NOT NULL, allowed boolean NOT NULL)"
+    ))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "partitioned spot_prices with covering primary key and BRIN index", _m0001_partitioned_spot_prices),
+    (2, "rate_limit_buckets for shared rate limiting", _m0002_rate_limit_buckets),
+]
+
+
+def migrate(engine: Engine) -> None:
+    """Kjører migreringer som ikke er utført ennå."""
+    if engine.dialect.name != "postgresql":
+        from .db import Base
+        from . import models_db  # noqa: F401  (registrerer tabellene)
+
+        Base.metadata.create_all(bind=engine)
+        return
+
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_KEY})
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version integer PRIMARY KEY, description text NOT NULL, "
+            "applied_at timestamptz NOT NULL DEFAULT now())"
+        ))
+        done = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+        for version, description, upgrade in MIGRATIONS:
+            if version in done:
+                continue
+            upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                {"v": version, "d": description},
+            )
+            print(f"[migrate] {version}: {description}")
+
+        # Sørg for at inneværende og neste måneder alltid har partisjoner
+        _ensure_upcoming(conn)
@@ -1,58 +1,214 @@
 # app/baseline.py
 """
-Baseline prediksjon: 7-dagers rullende timebasert snitt.
+Baseline-modeller: timebaserte aggregater beregnet direkte i databasen.
 
-For hver av de 24 timene i morgen beregnes gjennomsnittet av
-samme time de siste 7 dagene.
+For hver av de 24 timene i morgen beregnes et aggregat av samme time
+i et historisk vindu. Alle områder beregnes i én GROUP BY-spørring.
+
+Varianter:
+- mean:    snitt av samme time siste 7 dager
+- median:  median av samme time siste 7 dager
+- weekday: snitt av samme time på samme ukedag siste 4 uker
+- ewm:     eksponentielt vektet snitt (halveringstid 2 dager) siste 14 dager
+
+Mot andre databaser enn PostgreSQL (f.eks. SQLite lokalt) beregnes de samme
+aggregatene med numpy over load_prices, se aggregate_arrays.
 """
 from __future__ import annotations
 
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from datetime import date as dt_date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable
 
+from sqlalchemy import extract, func, literal, select
 from sqlalchemy.orm import Session
-from sqlalchemy import select
 
+from app.areas import AREAS
 from app.models_db import SpotPrice
+from app.profiling import phase
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+EWM_HALF_LIFE_DAYS = 2.0
+
+
+@dataclass(frozen=True)
+class BaselineVariant:
+    days: int
+    # (pris, time_start, slutten av vinduet) -> aggregat-uttrykk
+    aggregate: Callable
+    # (priser, alder i dager) -> aggregat, samme beregning med numpy
+    reduce: Callable
+    same_weekday: bool = False
+
+
+def _ewm(price, ts, end):
+    age_days = extract("epoch", end - ts) / 86400.0
+    weight = func.power(0.5, age_days / EWM_HALF_LIFE_DAYS)
+    return func.sum(weight * price) / func.sum(weight)
+
+
+def _ewm_arrays(prices, age_days):
+    weight = 0.5 ** (age_days / EWM_HALF_LIFE_DAYS)
+    return (weight * prices).sum() / weight.sum()
+
 
+def _median_arrays(prices, age_days):
+    import numpy as np
 
-def predict_baseline(db: Session, area: str) -> list[dict]:
+    # Som percentile_cont(0.5): lineær interpolasjon mellom de to midterste
+    return np.median(prices)
+
+
+VARIANTS: dict[str, BaselineVariant] = {
+    "mean": BaselineVariant(
+        days=7, aggregate=lambda p, ts, end: func.avg(p), reduce=lambda p, age: p.mean()
+    ),
+    "median": BaselineVariant(
+        days=7, aggregate=lambda p, ts, end: func.percentile_cont(0.5).within_group(p), reduce=_median_arrays
+    ),
+    "weekday": BaselineVariant(
+        days=28, aggregate=lambda p, ts, end: func.avg(p), reduce=lambda p, age: p.mean(), same_weekday=True
+    ),
+    "ewm": BaselineVariant(days=14, aggregate=_ewm, reduce=_ewm_arrays),
+}
+
+
+def aggregate_arrays(
+    variant: str,
+    ts: np.ndarray,
+    prices: np.ndarray,
+    target_day: dt_date,
+    end: datetime,
+) -> dict[int, tuple[float, int]]:
     """
-    Returnerer en 24-timers prediksjon for neste dag basert på
-    gjennomsnittet av samme time de siste 7 dagene.
+    Samme aggregat som aggregate_baseline for ett område, beregnet med numpy
+    på arrays fra load_prices over vinduet [end - days, end). Returnerer
+    {hour: (pris, antall)}.
     """
-    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
-    cutoff = now - timedelta(days=7)
+    if variant not in VARIANTS:
+        raise ValueError(f"Ukjent baseline-variant: {variant}")
+    spec = VARIANTS[variant]
+
+    end_s = end.timestamp()
+    mask = (ts >= end_s - spec.days * 86400) & (ts < end_s)
+    if spec.same_weekday:
+        # 1970-01-01 var en torsdag (isodow 4)
+        mask &= (ts // 86400 + 3) % 7 + 1 == target_day.isoweekday()
+    ts, prices = ts[mask], prices[mask]
+    hours = (ts // 3600) % 24
+
+    result: dict[int, tuple[float, int]] = {}
+    for h in range(24):
+        sel = hours == h
+        n = int(sel.sum())
+        if n:
+            price = spec.reduce(prices[sel], (end_s - ts[sel]) / 86400.0)
+            result[h] = (round(float(price), 4), n)
+    return result
+
+
+def aggregate_baseline(
+    db: Session,
+    variant: str,
+    target_day: dt_date,
+    end: datetime,
+    areas: list[str] | None = None,
+) -> dict[str, dict[int, tuple[float, int]]]:
+    """
+    Kjører én aggregatspørring for alle områdene over vinduet [end - days, end).
+    Returnerer {area: {hour: (pris, antall)}}.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Ukjent baseline-variant: {variant}")
+    spec = VARIANTS[variant]
+
+    if db.get_bind().dialect.name != "postgresql":
+        from app.models.loader import load_prices
+
+        start = end - timedelta(days=spec.days)
+        return {
+            area: aggregate_arrays(variant, *load_prices(db, area, start=start, end=end), target_day, end)
+            for area in (areas or AREAS)
+        }
+
+    utc_ts = func.timezone("UTC", SpotPrice.time_start)
+    hour = extract("hour", utc_ts)
+    end_param = literal(end)
 
     stmt = (
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.time_start >= cutoff)
+        select(
+            SpotPrice.area,
+            hour.label("hour"),
+            spec.aggregate(SpotPrice.nok_per_kwh, SpotPrice.time_start, end_param).label("price"),
+            func.count().label("n"),
+        )
+        .where(SpotPrice.area.in_(areas or AREAS))
+        .where(SpotPrice.time_start >= end - timedelta(days=spec.days))
+        .where(SpotPrice.time_start < end)
         .where(SpotPrice.nok_per_kwh.isnot(None))
-        .order_by(SpotPrice.time_start.asc())
+        .group_by(SpotPrice.area, hour)
     )
-    rows = db.execute(stmt).scalars().all()
+    if spec.same_weekday:
+        stmt = stmt.where(extract("isodow", utc_ts) == target_day.isoweekday())
 
-    # Grupper priser per time på dagen (0-23)
-    hourly: dict[int, list[float]] = defaultdict(list)
-    for r in rows:
-        ts = r.time_start
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        hourly[ts.hour].append(r.nok_per_kwh)
+    result: dict[str, dict[int, tuple[float, int]]] = {a: {} for a in (areas or AREAS)}
+    with phase("query"):
+        rows = db.execute(stmt).all()
+    for area, h, price, n in rows:
+        if price is not None:
+            result[area][int(h)] = (round(float(price), 4), int(n))
+    return result
 
-    # Bygg prediksjon for neste dag (starter midnatt neste dag UTC)
-    tomorrow_midnight = (now + timedelta(days=1)).replace(hour=0)
+
+def _points(hourly: dict[int, tuple[float, int]], midnight: datetime) -> list[dict]:
     points = []
     for h in range(24):
-        ts = tomorrow_midnight + timedelta(hours=h)
-        prices = hourly.get(h, [])
-        avg = round(sum(prices) / len(prices), 4) if prices else None
+        ts = midnight + timedelta(hours=h)
+        price, n = hourly.get(h, (None, 0))
         points.append({
             "timestamp": ts.isoformat(),
             "hour": h,
-            "price_nok_per_kwh": avg,
-            "n_samples": len(prices),
+            "price_nok_per_kwh": price,
+            "n_samples": n,
         })
-
     return points
+
+
+def predict_baseline_all(db: Session, variant: str = "mean", areas: list[str] | None = None) -> dict[str, list[dict]]:
+    """24-timers prediksjon for neste dag for alle områdene, beregnet i én spørring."""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    tomorrow_midnight = (now + timedelta(days=1)).replace(hour=0)
+
+    hourly = aggregate_baseline(db, variant, tomorrow_midnight.date(), end=now, areas=areas)
+    return {area: _points(h, tomorrow_midnight) for area, h in hourly.items()}
+
+
+def predict_baseline(db: Session, area: str, variant: str = "mean") -> list[dict]:
+    """
+    Returnerer en 24-timers prediksjon for neste dag basert på
+    valgt baseline-variant (standard: snitt av samme time siste 7 dager).
+    """
+    return predict_baseline_all(db, variant, areas=[area])[area]
+
+
+def predict_baseline_for_day(db: Session, area: str, today: dt_date) -> dict[int, float]:
+    """Baseline: 7-dagers rullende snitt for i dag, kun data FØR i dag."""
+    today_midnight = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
+
+    hourly = aggregate_baseline(db, "mean", today, end=today_midnight, areas=[area])[area]
+    return {h: price for h, (price, _n) in hourly.items()}
+
+
+def predict_baseline_arrays(
+    area: str,
+    ts: np.ndarray,
+    prices: np.ndarray,
+    midnight: datetime,
+    variant: str = "mean",
+) -> dict[int, float]:
+    """Som predict_baseline_for_day, men på arrays fra load_prices (brukes av sammenligningen)."""
+    hourly = aggregate_arrays(variant, ts, prices, midnight.date(), midnight)
+    return {h: price for h, (price, _n) in hourly.items()}
@@ -1,126 +1,47 @@
 """
 Evaluerer modeller ved å sammenligne hva de ville predikert for i dag
 (basert på gårsdagens data) mot faktiske priser for i dag.
+
+compare_models kjører flere modeller for flere områder: historikken lastes
+én gang per område for det lengste vinduet modellene trenger, og hver
+modell får sin del som array-utsnitt. Modellene kjøres samtidig i tråder
+(XGBoost-treningen går videre til treningspoolen), så en sammenligning
+tar omtrent like lang tid som den tregeste modellen.
 """
 from __future__ import annotations
 
+import contextvars
 import math
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone, date as dt_date
 
-import numpy as np
-import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.models.registry import get_model
 from app.models_db import SpotPrice
+from app.profiling import Timings, phase, record_parallel, run_with
+
+# Tråder for samtidige modellkjøringer i compare_models
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="compare")
 
 
 def _get_actual_today(db: Session, area: str, today: dt_date) -> dict[int, float]:
     """Henter faktiske priser for i dag. Returnerer {hour: price}."""
-    rows = db.execute(
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.date == today)
-        .where(SpotPrice.nok_per_kwh.isnot(None))
-        .order_by(SpotPrice.time_start.asc())
-    ).scalars().all()
+    with phase("query"):
+        rows = db.execute(
+            select(SpotPrice.time_start, SpotPrice.nok_per_kwh)
+            .where(SpotPrice.area == area)
+            .where(SpotPrice.date == today)
+            .where(SpotPrice.nok_per_kwh.isnot(None))
+            .order_by(SpotPrice.time_start.asc())
+        ).all()
 
     result = {}
-    for r in rows:
-        ts = r.time_start
+    for ts, price in rows:
         if ts.tzinfo is None:
             ts = ts.replace(tzinfo=timezone.utc)
-        result[ts.hour] = r.nok_per_kwh
-    return result
-
-
-def _predict_baseline_for_today(db: Session, area: str, today: dt_date) -> dict[int, float]:
-    """Baseline: 7-dagers rullende snitt for i dag, kun data FØR i dag."""
-    today_midnight = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
-    cutoff_start = today_midnight - timedelta(days=7)
-
-    rows = db.execute(
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.time_start >= cutoff_start)
-        .where(SpotPrice.time_start < today_midnight)
-        .where(SpotPrice.nok_per_kwh.isnot(None))
-        .order_by(SpotPrice.time_start.asc())
-    ).scalars().all()
-
-    hourly: dict[int, list[float]] = defaultdict(list)
-    for r in rows:
-        ts = r.time_start
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        hourly[ts.hour].append(r.nok_per_kwh)
-
-    return {h: round(sum(p) / len(p), 4) for h, p in hourly.items() if p}
-
-
-def _predict_xgboost_for_today(db: Session, area: str, today: dt_date) -> dict[int, float]:
-    """XGBoost: trener på data FØR i dag, predikerer i dag."""
-    import xgboost as xgb
-
-    today_midnight = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
-    cutoff_start = today_midnight - timedelta(days=60)
-
-    rows = db.execute(
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.time_start >= cutoff_start)
-        .where(SpotPrice.time_start < today_midnight)
-        .where(SpotPrice.nok_per_kwh.isnot(None))
-        .order_by(SpotPrice.time_start.asc())
-    ).scalars().all()
-
-    if not rows or len(rows) < 48:
-        raise ValueError(f"Ikke nok historiske data for evaluering ({len(rows)} rader)")
-
-    df = pd.DataFrame([{
-        "time_start": r.time_start if r.time_start.tzinfo else r.time_start.replace(tzinfo=timezone.utc),
-        "nok_per_kwh": r.nok_per_kwh,
-    } for r in rows]).set_index("time_start").sort_index()
-
-    df["hour"] = df.index.hour
-    df["day_of_week"] = df.index.dayofweek
-    df["month"] = df.index.month
-    df["lag_24"] = df["nok_per_kwh"].shift(24)
-    df["lag_48"] = df["nok_per_kwh"].shift(48)
-    df["lag_168"] = df["nok_per_kwh"].shift(168)
-    df["rolling_mean_7d"] = df["nok_per_kwh"].shift(24).rolling(window=168, min_periods=24).mean()
-    df = df.dropna()
-
-    feature_cols = ["hour", "day_of_week", "month", "lag_24", "lag_48", "lag_168", "rolling_mean_7d"]
-    model = xgb.XGBRegressor(
-        n_estimators=200, max_depth=4, learning_rate=0.05,
-        subsample=0.8, colsample_bytree=0.8, random_state=42, verbosity=0,
-    )
-    model.fit(df[feature_cols].values, df["nok_per_kwh"].values)
-
-    recent = df["nok_per_kwh"]
-    result = {}
-
-    for h in range(24):
-        ts = today_midnight + timedelta(hours=h)
-
-        def get_price_at(target_ts):
-            try:
-                idx = recent.index.get_indexer([target_ts], method="nearest")[0]
-                return float(recent.iloc[idx])
-            except Exception:
-                return float(recent.mean())
-
-        lag_24_val = get_price_at(ts - timedelta(hours=24))
-        lag_48_val = get_price_at(ts - timedelta(hours=48))
-        lag_168_val = get_price_at(ts - timedelta(hours=168))
-        same_hour = df[df.index.hour == h]["nok_per_kwh"].tail(7)
-        rolling_mean = float(same_hour.mean()) if len(same_hour) > 0 else float(recent.mean())
-
-        features = np.array([[h, ts.weekday(), ts.month, lag_24_val, lag_48_val, lag_168_val, rolling_mean]])
-        result[h] = max(0.0, round(float(model.predict(features)[0]), 4))
-
+        result[ts.hour] = price
     return result
 
 
@@ -136,25 +57,10 @@ def evaluate_model(db: Session, model_id: str, area: str) -> dict:
             "hours_available": len(actual),
         }
 
-    if model_id == "baseline":
-        predicted = _predict_baseline_for_today(db, area, today)
-    elif model_id == "xgboost":
-        predicted = _predict_xgboost_for_today(db, area, today)
-    else:
-        raise ValueError(f"Ukjent modell: {model_id}")
-
-    hours = sorted(set(actual.keys()) & set(predicted.keys()))
-    n = len(hours)
-    errors = [abs(actual[h] - predicted[h]) for h in hours]
-    sq_errors = [(actual[h] - predicted[h]) ** 2 for h in hours]
-    pct_errors = [abs((actual[h] - predicted[h]) / actual[h]) for h in hours if actual[h] != 0]
-
-    mae = round(sum(errors) / n, 4)
-    rmse = round(math.sqrt(sum(sq_errors) / n), 4)
-    mape = round(sum(pct_errors) / len(pct_errors) * 100, 2) if pct_errors else None
-
-    best_hour = hours[errors.index(min(errors))]
-    worst_hour = hours[errors.index(max(errors))]
+    predicted = get_model(model_id).evaluate_fn()(db, area, today)
+    scored = score(actual, predicted)
+    if scored is None:
+        raise ValueError("Ingen overlappende timer mellom prediksjon og faktiske priser")
 
     points = [
         {
@@ -171,9 +77,98 @@ def evaluate_model(db: Session, model_id: str, area: str) -> dict:
         "model": model_id,
         "area": area,
         "date": today.isoformat(),
+        **scored,
+        "points": points,
+    }
+
+
+def score(actual: dict[int, float], predicted: dict[int, float]) -> dict | None:
+    """MAE, RMSE og MAPE over timene som finnes i begge, eller None uten overlapp."""
+    hours = sorted(set(actual.keys()) & set(predicted.keys()))
+    n = len(hours)
+    if n == 0:
+        return None
+    errors = [abs(actual[h] - predicted[h]) for h in hours]
+    sq_errors = [(actual[h] - predicted[h]) ** 2 for h in hours]
+    pct_errors = [abs((actual[h] - predicted[h]) / actual[h]) for h in hours if actual[h] != 0]
+
+    mae = round(sum(errors) / n, 4)
+    rmse = round(math.sqrt(sum(sq_errors) / n), 4)
+    mape = round(sum(pct_errors) / len(pct_errors) * 100, 2) if pct_errors else None
+
+    return {
         "metrics": {"mae": mae, "rmse": rmse, "mape": mape},
-        "best_hour": best_hour,
-        "worst_hour": worst_hour,
+        "best_hour": hours[errors.index(min(errors))],
+        "worst_hour": hours[errors.index(max(errors))],
         "n_hours": n,
-        "points": points,
+    }
+
+
+def compare_models(db: Session, model_ids: list[str], areas: list[str], day: dt_date) -> dict:
+    """Prediksjoner og metrikker for dagen side om side, per område og modell."""
+    import numpy as np
+
+    from app.models.loader import load_prices
+    from app.models.pool import PoolBusy
+
+    specs = [get_model(m) for m in model_ids]
+    midnight = datetime.combine(day, datetime.min.time()).replace(tzinfo=timezone.utc)
+    start = midnight - timedelta(days=max(spec.history_days for spec in specs))
+
+    # Data lastes sekvensielt i forespørselstråden (sesjonen er ikke trådsikker)
+    actuals: dict[str, dict[int, float]] = {}
+    futures = {}
+    task_timings: list[Timings] = []
+    for area in areas:
+        actuals[area] = _get_actual_today(db, area, day)
+        ts, prices = load_prices(db, area, start=start, end=midnight)
+        for spec in specs:
+            lo = int(np.searchsorted(ts, int((midnight - timedelta(days=spec.history_days)).timestamp())))
+            # Hver oppgave får egne fasetider; de slås sammen etter veggklokke under
+            timings = Timings()
+            task_timings.append(timings)
+            futures[area, spec.model_id] = _executor.submit(
+                contextvars.copy_context().run, run_with, timings,
+                spec.evaluate_arrays_fn(), area, ts[lo:], prices[lo:], midnight,
+            )
+
+    results: dict[str, dict] = {}
+    for area in areas:
+        actual = actuals[area]
+        predictions: dict[str, dict[int, float]] = {}
+        models: dict[str, dict] = {}
+        for spec in specs:
+            try:
+                predictions[spec.model_id] = futures[area, spec.model_id].result()
+            except PoolBusy:
+                raise
+            except Exception as e:
+                models[spec.model_id] = {"status": "error", "detail": str(e)}
+                continue
+            scored = score(actual, predictions[spec.model_id]) if len(actual) == 24 else None
+            models[spec.model_id] = {"status": "ok" if scored else "no_metrics", **(scored or {})}
+
+        ranked = [m for m in models if "metrics" in models[m]]
+        results[area] = {
+            "status": "ok" if len(actual) == 24 else "incomplete",
+            "hours_available": len(actual),
+            "models": models,
+            "ranking": sorted(ranked, key=lambda m: models[m]["metrics"]["mae"]),
+            "points": [
+                {
+                    "hour": h,
+                    "time": f"{h:02d}:00",
+                    "actual": actual.get(h),
+                    **{m: p.get(h) for m, p in predictions.items()},
+                }
+                for h in range(24)
+            ],
+        }
+
+    record_parallel(task_timings)
+    return {
+        "status": "ok",
+        "date": day.isoformat(),
+        "models": [spec.model_id for spec in specs],
+        "areas": results,
     }
@@ -0,0 +1,83 @@
+"""
+Felles kolonnebasert laster for prishistorikk.
+
+Henter kun (time_start, nok_per_kwh) som tupler, uten å bygge ORM-objekter.
+Tidssone normaliseres i SQL ved å hente time_start som epoch-sekunder (UTC),
+slik at radene kan fylles rett inn i NumPy-arrays.
+
+Dekker det delte snapshotet (app/snapshot.py) intervallet, leses prisene
+derfra uten databasekall.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+
+from app import snapshot
+from app.models_db import SpotPrice
+from app.profiling import phase
+
+
+def load_prices(
+    db: Session,
+    area: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Henter priser for et område i intervallet [start, end).
+    Returnerer (epoch-sekunder UTC som int64, nok_per_kwh som float64), sortert på tid.
+    Arrays fra snapshotet er read-only.
+    """
+    snap = snapshot.current()
+    if snap is not None:
+        with phase("snapshot"):
+            hit = snap.prices(area, start, end)
+        if hit is not None:
+            return hit
+
+    epoch = cast(func.extract("epoch", SpotPrice.time_start), Float)
+
+    stmt = (
+        select(epoch, SpotPrice.nok_per_kwh)
+        .where(SpotPrice.area == area)
+        .where(SpotPrice.nok_per_kwh.isnot(None))
+    )
+    if start is not None:
+        stmt = stmt.where(SpotPrice.time_start >= start)
+    if end is not None:
+        stmt = stmt.where(SpotPrice.time_start < end)
+    stmt = stmt.order_by(SpotPrice.time_start.asc())
+
+    with phase("query"):
+        rows = db.execute(stmt).all()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        arr = np.array(rows, dtype=np.float64)
+    return arr[:, 0].astype(np.int64), arr[:, 1]
+
+
+def load_price_frame(
+    db: Session,
+    area: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """Som load_prices, men returnerer en DataFrame med UTC-indeks (time_start) og kolonnen nok_per_kwh."""
+    return price_frame(*load_prices(db, area, start, end))
+
+
+def price_frame(ts: np.ndarray, prices: np.ndarray):
+    """Bygger DataFrame med UTC-indeks (time_start) fra arrays fra load_prices."""
+    import pandas as pd
+
+    if len(ts) == 0:
+        return pd.DataFrame()
+
+    index = pd.to_datetime(ts, unit="s", utc=True).rename("time_start")
+    return pd.DataFrame({"nok_per_kwh": prices}, index=index)
+
@@ -0,0 +1,62 @@
+# app/models/params.py
+"""
+Hyperparametere for XGBoost per område.
+
+Standardverdiene brukes til `python -m app.models.tuning` har lagret beste
+konfigurasjon per område i XGBOOST_PARAMS_PATH (JSON). Filen leses på nytt
+når den endres, så nye parametere tas i bruk uten omstart.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+XGBOOST_PARAMS_PATH = os.getenv("XGBOOST_PARAMS_PATH", os.path.join("data", "xgboost_params.json"))
+
+DEFAULT_PARAMS = {
+    "n_estimators": 200,
+    "max_depth": 4,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}
+
+_cache: dict = {"mtime": None, "data": {}}
+_lock = threading.Lock()
+
+
+def _read() -> dict:
+    try:
+        mtime = os.path.getmtime(XGBOOST_PARAMS_PATH)
+    except OSError:
+        return {}
+
+    with _lock:
+        if _cache["mtime"] != mtime:
+            with open(XGBOOST_PARAMS_PATH, encoding="utf-8") as f:
+                _cache["data"] = json.load(f)
+            _cache["mtime"] = mtime
+        return _cache["data"]
+
+
+def load_params(area: str) -> dict:
+    """Beste lagrede parametere for området, ellers standardverdiene."""
+    entry = _read().get(area)
+    if not entry:
+        return dict(DEFAULT_PARAMS)
+    return {**DEFAULT_PARAMS, **entry["params"]}
+
+
+def save_params(results: dict) -> None:
+    """Slår sammen {area: {"params": ..., ...}} med eksisterende fil og skriver atomisk."""
+    data = dict(_read())
+    data.update(results)
+
+    directory = os.path.dirname(XGBOOST_PARAMS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = XGBOOST_PARAMS_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, XGBOOST_PARAMS_PATH)
@@ -0,0 +1,128 @@
+# app/models/pool.py
+"""
+Begrenset prosesspool for modelltrening.
+
+Trening og inferens kjøres i egne prosesser, slik at FastAPI-trådene som
+/spot og historikk trenger ikke blir bundet opp. Antall prosesser og hvor
+mange jobber som kan stå i kø styres med env-variabler:
+
+- TRAINING_WORKERS (standard 2)
+- TRAINING_QUEUE_DEPTH (standard 4)
+- TRAINING_RETRY_AFTER (sekunder, standard 10)
+
+Er køen full kastes PoolBusy, som API-et gjør om til 503 med Retry-After.
+Identiske jobber (samme nøkkel) som allerede kjører deler ett resultat.
+
+Poolen startes ved første jobb, eller på forhånd med warm_up (MODEL_WARMUP),
+som også importerer tunge moduler i arbeiderne.
+"""
+from __future__ import annotations
+
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "2"))
+TRAINING_QUEUE_DEPTH = int(os.getenv("TRAINING_QUEUE_DEPTH", "4"))
+TRAINING_RETRY_AFTER = int(os.getenv("TRAINING_RETRY_AFTER", "10"))
+
+
+class PoolBusy(Exception):
+    def __init__(self, retry_after: int = TRAINING_RETRY_AFTER):
+        super().__init__("Treningskøen er full, prøv igjen senere")
+        self.retry_after = retry_after
+
+
+_executor: ProcessPoolExecutor | None = None
+_inflight: dict[Hashable, Future] = {}
+_lock = threading.RLock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: arbeiderne arver ikke DB-tilkoblinger eller tråder fra API-prosessen
+        _executor = ProcessPoolExecutor(
+            max_workers=TRAINING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _forget(key: Hashable, fut: Future) -> None:
+    with _lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+
+
+def data_version(ts: np.ndarray, prices: np.ndarray) -> tuple:
+    """Billig fingeravtrykk av treningsdataene, brukt i nøkkelen for deduplisering."""
+    if len(ts) == 0:
+        return (0,)
+    return (len(ts), int(ts[0]), int(ts[-1]), round(float(prices.sum()), 6))
+
+
+def run_in_pool(key: Hashable, fn: Callable, *args: Any) -> Any:
+    """
+    Kjører fn(*args) i prosesspoolen og venter på resultatet.
+    Kaster PoolBusy hvis det allerede er TRAINING_WORKERS + TRAINING_QUEUE_DEPTH jobber i gang.
+    """
+    global _executor
+
+    with _lock:
+        fut = _inflight.get(key)
+        if fut is None:
+            if len(_inflight) >= TRAINING_WORKERS + TRAINING_QUEUE_DEPTH:
+                raise PoolBusy()
+            try:
+                fut = _get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                _executor = None
+                fut = _get_executor().submit(fn, *args)
+            _inflight[key] = fut
+            fut.add_done_callback(lambda f, k=key: _forget(k, f))
+
+    try:
+        return fut.result()
+    except BrokenProcessPool:
+        # En arbeider døde (f.eks. OOM); start en ny pool ved neste jobb
+        with _lock:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+                _executor = None
+        raise
+
+
+def _import_modules(modules: list[str]) -> int:
+    for name in modules:
+        importlib.import_module(name)
+    return os.getpid()
+
+
+def warm_up(modules: list[str]) -> int:
+    """
+    Starter arbeiderne og importerer modulene i hver av dem, så første
+    trening slipper prosessoppstart og import. Returnerer antall arbeidere
+    som svarte. Teller ikke mot køgrensen.
+    """
+    with _lock:
+        executor = _get_executor()
+        # Én jobb per arbeider; poolen starter en ny prosess når ingen er ledige
+        futures = [executor.submit(_import_modules, modules) for _ in range(TRAINING_WORKERS)]
+    return len({fut.result() for fut in futures})
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,120 @@
+# app/models/registry.py
+"""
+Modellregister med lat import.
+
+Hver modell registrerer metadata og hvilken modul/funksjon som gjør jobben.
+Modulen (og dermed numpy og modellkoden) importeres først når modellen
+brukes, eller når warm_up kalles etter at serveren er oppe. Modeller som
+trener i treningspoolen har i tillegg en prepare-funksjon som warm_up
+kaller, så arbeiderprosessene startes og importerer sitt på forhånd.
+"""
+from __future__ import annotations
+
+import importlib
+import threading
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Callable, Iterable
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    model_id: str
+    name: str
+    description: str
+    module: str
+    forecast: str   # (db, area) -> list[dict] med 24 punkter for i morgen
+    evaluate: str   # (db, area, day) -> {hour: pris} basert på data før dagen
+    # (area, ts, prices, midnight) -> {hour: pris}, på arrays fra load_prices for
+    # [midnight - history_days, midnight). Brukes av sammenligningen som laster historikken én gang
+    evaluate_arrays: str
+    history_days: int
+    prepare: str | None = None   # () -> None, gjør klar det modulimporten ikke dekker
+
+    def load(self) -> ModuleType:
+        return _load_module(self.module)
+
+    def forecast_fn(self) -> Callable:
+        return getattr(self.load(), self.forecast)
+
+    def evaluate_fn(self) -> Callable:
+        return getattr(self.load(), self.evaluate)
+
+    def evaluate_arrays_fn(self) -> Callable:
+        return getattr(self.load(), self.evaluate_arrays)
+
+    def info(self) -> dict:
+        return {
+            "id": self.model_id,
+            "name": self.name,
+            "description": self.description,
+            "loaded": self.module in _loaded,
+        }
+
+
+_registry: dict[str, ModelSpec] = {}
+_loaded: dict[str, ModuleType] = {}
+_lock = threading.Lock()
+
+
+def _load_module(name: str) -> ModuleType:
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        if name not in _loaded:
+            _loaded[name] = importlib.import_module(name)
+        return _loaded[name]
+
+
+def register(spec: ModelSpec) -> ModelSpec:
+    _registry[spec.model_id] = spec
+    return spec
+
+
+def get_model(model_id: str) -> ModelSpec:
+    try:
+        return _registry[model_id]
+    except KeyError:
+        raise ValueError(f"Ukjent modell: {model_id}") from None
+
+
+def list_models() -> list[ModelSpec]:
+    return list(_registry.values())
+
+
+def warm_up(model_ids: Iterable[str] | None = None) -> None:
+    """Importerer modellene på forhånd. Kalles i bakgrunnen etter oppstart."""
+    for model_id in model_ids or _registry:
+        try:
+            spec = get_model(model_id)
+            module = spec.load()
+            if spec.prepare:
+                getattr(module, spec.prepare)()
+            print(f"[models] {model_id}: lastet")
+        except Exception as e:
+            print(f"[models] {model_id}: feil ved lasting: {e}")
+
+
+register(ModelSpec(
+    model_id="baseline",
+    name="Baseline",
+    description="Timebasert snitt av samme time siste 7 dager",
+    module="app.models.baseline",
+    forecast="predict_baseline",
+    evaluate="predict_baseline_for_day",
+    evaluate_arrays="predict_baseline_arrays",
+    history_days=7,
+))
+
+register(ModelSpec(
+    model_id="xgboost",
+    name="XGBoost",
+    description="Gradient boosting på kalender- og lag-features fra siste 60 dager",
+    module="app.models.xgboost_model",
+    forecast="predict_xgboost",
+    evaluate="predict_xgboost_for_day",
+    evaluate_arrays="predict_xgboost_arrays",
+    history_days=60,
+    prepare="warm_up_pool",
+))
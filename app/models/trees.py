@@ -0,0 +1,130 @@
+# app/models/trees.py
+"""
+Kompakt trerepresentasjon for prediksjon uten xgboost.
+
+En trent booster eksporteres til flate node-arrays (feature, terskel,
+venstre/høyre barn, retning ved manglende verdi og bladverdi) for alle
+trærne samlet. predict() evaluerer alle rader mot alle trær samtidig med
+NumPy, ett nivå om gangen, og gir samme resultat som XGBoost: input og
+terskler er float32, x < terskel går til venstre, NaN følger default_left,
+og bladverdiene summeres i float32 i samme rekkefølge som XGBoost.
+
+Bare xgboost-treningen (i treningspoolen) trenger from_booster(); API-
+prosessen trenger bare numpy.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+# Objektiver der prediksjonen er margin uten transformasjon
+_IDENTITY_OBJECTIVES = {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror"}
+
+
+@dataclass(frozen=True)
+class CompiledTrees:
+    feature: np.ndarray        # int32, splitt-feature per node
+    threshold: np.ndarray      # float32, x < terskel går til venstre
+    left: np.ndarray           # int32, global indeks; -1 for blad
+    right: np.ndarray          # int32, global indeks; -1 for blad
+    default_left: np.ndarray   # bool, retning når x er NaN
+    value: np.ndarray          # float32, bladverdi (0 for splitt-noder)
+    roots: np.ndarray          # int32, rotnode per tre
+    depth: int                 # største dybde blant trærne
+    base_score: float
+    n_features: int
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                      self.default_left, self.value, self.roots))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Forventet matrise med {self.n_features} kolonner, fikk {X.shape}")
+
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(child < 0, node, child)
+
+        leaves = self.value[node]
+        out = np.full(len(X), self.base_score, dtype=np.float32)
+        for t in range(self.n_trees):
+            out += leaves[:, t]
+        return out
+
+
+def _base_score(raw: Any) -> float:
+    # Lagres som "5E-1" eller "[5E-1]" avhengig av xgboost-versjon
+    return float(str(raw).strip("[]"))
+
+
+def _depth(left: list, right: list) -> int:
+    depth, level = 0, [0]
+    while True:
+        level = [c for n in level for c in (left[n], right[n]) if c >= 0]
+        if not level:
+            return depth
+        depth += 1
+
+
+def from_model_json(model: dict) -> CompiledTrees:
+    """Bygger CompiledTrees fra xgboost sitt JSON-modellformat (booster.save_raw("json"))."""
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in _IDENTITY_OBJECTIVES:
+        raise ValueError(f"Objektivet støttes ikke: {objective}")
+
+    booster = learner["gradient_booster"]
+    if booster.get("name", "gbtree") != "gbtree":
+        raise ValueError(f"Boosteren støttes ikke: {booster.get('name')}")
+    trees = booster["model"]["trees"]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    for tree in trees:
+        offset = len(feature)
+        roots.append(offset)
+        t_left, t_right = tree["left_children"], tree["right_children"]
+        depth = max(depth, _depth(t_left, t_right))
+        for i, (lc, rc) in enumerate(zip(t_left, t_right)):
+            is_leaf = lc < 0
+            feature.append(0 if is_leaf else tree["split_indices"][i])
+            # For blad ligger bladverdien i split_conditions
+            threshold.append(0.0 if is_leaf else tree["split_conditions"][i])
+            value.append(tree["split_conditions"][i] if is_leaf else 0.0)
+            left.append(-1 if is_leaf else lc + offset)
+            right.append(-1 if is_leaf else rc + offset)
+            default_left.append(bool(tree["default_left"][i]))
+
+    return CompiledTrees(
+        feature=np.asarray(feature, dtype=np.int32),
+        threshold=np.asarray(threshold, dtype=np.float32),
+        left=np.asarray(left, dtype=np.int32),
+        right=np.asarray(right, dtype=np.int32),
+        default_left=np.asarray(default_left, dtype=bool),
+        value=np.asarray(value, dtype=np.float32),
+        roots=np.asarray(roots, dtype=np.int32),
+        depth=depth,
+        base_score=_base_score(learner["learner_model_param"]["base_score"]),
+        n_features=int(learner["learner_model_param"]["num_feature"]),
+    )
+
+
+def from_booster(booster) -> CompiledTrees:
+    """Eksporterer en xgboost Booster (eller XGBRegressor) til CompiledTrees."""
+    if hasattr(booster, "get_booster"):
+        booster = booster.get_booster()
+    return from_model_json(json.loads(bytes(booster.save_raw(raw_format="json"))))
@@ -0,0 +1,272 @@
+# app/models/tuning.py
+"""
+Offline tuning av XGBoost-parametere per område.
+
+Rullerende kryssvalidering (rolling origin): hver fold trener på de
+siste history_days dagene før et tidspunkt og validerer på neste blokk.
+Vinduet er det samme som /api/forecast/xgboost trener på (history_days i
+modellregisteret), så dybde og antall trær passer til datamengden modellen
+faktisk får. Feature-matrisen bygges én gang per område og legges i delt
+minne, så arbeiderprosessene leser den uten kopi.
+
+Konfigurasjoner evalueres på første fold først. Bare de som er innenfor
+PRUNE_FACTOR av beste resultat så langt får kjøre de resterende foldene.
+Early stopping bruker de siste radene av treningsdelen i hver fold, ikke
+valideringsblokken som scores, så valideringen holdes utenfor modellvalget.
+
+Beste konfigurasjon per område lagres i XGBOOST_PARAMS_PATH og brukes av
+/api/forecast/xgboost ved neste trening.
+
+Kjøres med:
+    python -m app.models.tuning --areas all --search random --n-iter 30 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from app.areas import AREAS
+from app.models.registry import get_model
+from app.models.xgboost_model import FEATURE_COLS, _build_features
+
+# Treningsvinduet i serving, se registreringen av xgboost i app/models/registry.py
+HISTORY_DAYS = get_model("xgboost").history_days
+
+GRID = {
+    "n_estimators": [400, 800],
+    "max_depth": [3, 4, 6],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "subsample": [0.8, 1.0],
+    "colsample_bytree": [0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+
+# Konfigurasjoner med RMSE over PRUNE_FACTOR * beste på første fold stoppes
+PRUNE_FACTOR = 1.15
+EARLY_STOPPING_ROUNDS = 30
+
+# Settes i hver arbeider av _attach
+_shm: list = []
+_X: np.ndarray | None = None
+_y: np.ndarray | None = None
+
+
+def _attach(x_name: str, y_name: str, n_rows: int, n_cols: int) -> None:
+    global _X, _y
+    shm_x = shared_memory.SharedMemory(name=x_name)
+    shm_y = shared_memory.SharedMemory(name=y_name)
+    _shm.extend([shm_x, shm_y])
+    _X = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=shm_x.buf)
+    _y = np.ndarray((n_rows,), dtype=np.float64, buffer=shm_y.buf)
+
+
+def _fit_fold(config_id: int, params: dict, train_start: int, train_end: int,
+              val_end: int) -> tuple[int, float, int]:
+    """
+    Validerer på rader [train_end, val_end). Early stopping bruker like mange
+    rader rett før train_end, og modellen trenes på resten fra train_start.
+    Returnerer (id, rmse, beste runde).
+    """
+    import xgboost as xgb
+
+    es_start = train_end - (val_end - train_end)
+
+    model = xgb.XGBRegressor(
+        **params,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        random_state=42,
+        verbosity=0,
+        n_jobs=1,
+    )
+    X_es, y_es = _X[es_start:train_end], _y[es_start:train_end]
+    model.fit(_X[train_start:es_start], _y[train_start:es_start], eval_set=[(X_es, y_es)], verbose=False)
+
+    X_val, y_val = _X[train_end:val_end], _y[train_end:val_end]
+    pred = model.predict(X_val)
+    rmse = float(np.sqrt(np.mean((pred - y_val) ** 2)))
+    return config_id, rmse, int(model.best_iteration)
+
+
+def folds(n_rows: int, n_folds: int, val_size: int) -> list[tuple[int, int]]:
+    """
+    Rolling origin: n_folds blokker på val_size rader bakerst i serien. Første
+    fold må ha plass til både trening og en early stopping-blokk på val_size.
+    """
+    first = n_rows - n_folds * val_size
+    if first <= 2 * val_size:
+        raise ValueError("For lite data for valgt antall folds")
+    return [(first + i * val_size, first + (i + 1) * val_size) for i in range(n_folds)]
+
+
+def training_windows(ts: np.ndarray, splits: list[tuple[int, int]], window_days: int,
+                     val_size: int) -> list[tuple[int, int, int]]:
+    """
+    (train_start, train_end, val_end) per fold, der treningen starter
+    window_days før første validerte rad (ts er epoch-sekunder per rad).
+    """
+    windows = []
+    for train_end, val_end in splits:
+        train_start = int(np.searchsorted(ts, ts[train_end] - window_days * 86400, side="left"))
+        if train_end - train_start <= 2 * val_size:
+            raise ValueError(f"For lite data i treningsvinduet på {window_days} dager")
+        windows.append((train_start, train_end, val_end))
+    return windows
+
+
+def candidates(search: str, n_iter: int, seed: int = 42) -> list[dict]:
+    keys = list(GRID)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(GRID[k] for k in keys))]
+    if search == "grid":
+        return grid
+    rng = random.Random(seed)
+    return rng.sample(grid, min(n_iter, len(grid)))
+
+
+def tune_area(
+    X: np.ndarray,
+    y: np.ndarray,
+    ts: np.ndarray,
+    configs: list[dict],
+    n_folds: int,
+    val_size: int,
+    workers: int,
+    window_days: int = HISTORY_DAYS,
+) -> dict | None:
+    """Kjører kryssvalideringen for ett område og returnerer beste konfigurasjon."""
+    splits = training_windows(ts, folds(len(y), n_folds, val_size), window_days, val_size)
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    shm_x = shared_memory.SharedMemory(create=True, size=X.nbytes)
+    shm_y = shared_memory.SharedMemory(create=True, size=y.nbytes)
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=shm_x.buf)[:] = X
+        np.ndarray(y.shape, dtype=y.dtype, buffer=shm_y.buf)[:] = y
+
+        scores: dict[int, list[float]] = {i: [] for i in range(len(configs))}
+        rounds: dict[int, list[int]] = {i: [] for i in range(len(configs))}
+        best_first = float("inf")
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_attach,
+            initargs=(shm_x.name, shm_y.name, X.shape[0], X.shape[1]),
+        ) as pool:
+            pending = {
+                pool.submit(_fit_fold, i, params, *splits[0])
+                for i, params in enumerate(configs)
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i, rmse, best_round = fut.result()
+                    scores[i].append(rmse)
+                    rounds[i].append(best_round)
+
+                    fold = len(scores[i])
+                    if fold == 1:
+                        best_first = min(best_first, rmse)
+                    if scores[i][0] > PRUNE_FACTOR * best_first:
+                        continue
+                    if fold < n_folds:
+                        pending.add(pool.submit(_fit_fold, i, configs[i], *splits[fold]))
+    finally:
+        shm_x.close()
+        shm_x.unlink()
+        shm_y.close()
+        shm_y.unlink()
+
+    complete = [i for i in scores if len(scores[i]) == n_folds]
+    if not complete:
+        return None
+
+    best = min(complete, key=lambda i: np.mean(scores[i]))
+    params = dict(configs[best])
+    # Antall trær settes til snittet av beste runde fra early stopping
+    params["n_estimators"] = int(np.mean(rounds[best])) + 1
+    return {
+        "params": params,
+        "cv_rmse": round(float(np.mean(scores[best])), 5),
+        "n_configs": len(configs),
+        "n_pruned": len(configs) - len(complete),
+        "n_rows": int(len(y)),
+        "history_days": window_days,
+        "tuned_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def load_features(area: str, days: int):
+    """(X, y, ts) for området, der ts er epoch-sekunder (UTC) per rad."""
+    from app.db import SessionLocal
+    from app.models.loader import load_price_frame
+
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        df = load_price_frame(db, area, start=cutoff)
+    finally:
+        db.close()
+
+    if df.empty:
+        raise ValueError(f"Ingen data for {area}")
+    df_feat = _build_features(df)
+    if df_feat.empty:
+        raise ValueError(f"Ingen komplette features for {area}")
+    import pandas as pd
+
+    ts = ((df_feat.index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    return df_feat[FEATURE_COLS].values, df_feat["nok_per_kwh"].values, ts
+
+
+def main() -> None:
+    from app.models.params import XGBOOST_PARAMS_PATH, save_params
+
+    parser = argparse.ArgumentParser(description="Tuning av XGBoost-parametere per område")
+    parser.add_argument("--areas", default="all", help="kommaseparert liste eller 'all'")
+    parser.add_argument("--days", type=int, default=None,
+                        help="dager med historikk (standard: treningsvinduet pluss valideringsblokkene)")
+    parser.add_argument("--search", choices=["grid", "random"], default="random")
+    parser.add_argument("--n-iter", type=int, default=30, help="antall konfigurasjoner ved random search")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--val-size", type=int, default=24 * 7, help="rader per valideringsblokk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    areas = AREAS if args.areas.lower() == "all" else [a.strip().upper() for a in args.areas.split(",")]
+    configs = candidates(args.search, args.n_iter)
+    # Nok til treningsvinduet for første fold, valideringsblokkene (timer) og en uke til lag-features
+    days = args.days or HISTORY_DAYS + math.ceil(args.folds * args.val_size / 24) + 8
+
+    results = {}
+    for area in areas:
+        try:
+            X, y, ts = load_features(area, days)
+            result = tune_area(X, y, ts, configs, args.folds, args.val_size, args.workers)
+        except ValueError as e:
+            print(f"[{area}] hopper over: {e}")
+            continue
+        if result is None:
+            print(f"[{area}] ingen konfigurasjon fullførte")
+            continue
+        results[area] = result
+        print(f"[{area}] rmse {result['cv_rmse']} ({result['n_pruned']} av {result['n_configs']} stoppet): {result['params']}")
+
+    if results:
+        save_params(results)
+        print(f"Lagret i {XGBOOST_PARAMS_PATH}")
+
+
+if __name__ == "__main__":
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL mangler")
+
+    main()
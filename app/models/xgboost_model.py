@@ -10,46 +10,34 @@ Trener en XGBoost-modell på historiske timespriser med følgende features:
 - lag_48: pris 48 timer siden
 - lag_168: pris 7 dager siden (samme time forrige uke)
 - rolling_mean_7d: snitt av samme time siste 7 dager
+
+Treningen kjøres i treningspoolen, og trærne eksporteres til CompiledTrees
+(app/models/trees.py). Prediksjonen gjøres i API-prosessen med numpy, så
+xgboost og pandas lastes bare i poolens arbeiderprosesser.
 """
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter
+from typing import TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-
-from app.models_db import SpotPrice
-
-
-import xgboost as xgb
-
-
-
-def _fetch_history(db: Session, area: str, days: int = 60) -> pd.DataFrame:
-    """Henter historiske priser fra databasen og returnerer som DataFrame."""
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
-    stmt = (
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.time_start >= cutoff)
-        .where(SpotPrice.nok_per_kwh.isnot(None))
-        .order_by(SpotPrice.time_start.asc())
-    )
-    rows = db.execute(stmt).scalars().all()
+from app.models.loader import load_prices, price_frame
+from app.models.params import DEFAULT_PARAMS, load_params
+from app.models import pool
+from app.models.pool import data_version, run_in_pool
+from app.models.trees import CompiledTrees, from_booster
+from app.profiling import phase, record
 
-    if not rows:
-        return pd.DataFrame()
+if TYPE_CHECKING:
+    import pandas as pd
 
-    df = pd.DataFrame([{
-        "time_start": r.time_start if r.time_start.tzinfo else r.time_start.replace(tzinfo=timezone.utc),
-        "nok_per_kwh": r.nok_per_kwh,
-    } for r in rows])
 
-    df = df.set_index("time_start").sort_index()
-    return df
+FEATURE_COLS = ["hour", "day_of_week", "month", "lag_24", "lag_48", "lag_168", "rolling_mean_7d"]
 
 
 def _build_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -77,78 +65,174 @@ def _build_features(df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna()
 
 
-def predict_xgboost(db: Session, area: str) -> list[dict]:
+def train(
+    ts: np.ndarray,
+    prices: np.ndarray,
+    params: dict | None = None,
+) -> tuple[CompiledTrees, int, dict[str, float]]:
     """
-    Trener XGBoost på historiske data og predikerer neste 24 timer.
-    Returnerer samme format som baseline for enkel sammenligning.
+    Trener XGBoost på historikken (arrays fra load_prices) og eksporterer
+    trærne til CompiledTrees. Ren funksjon uten database, slik at den kan
+    kjøres i treningspoolen; bare her trengs xgboost og pandas. Returnerer
+    (modell, antall treningsrader, tid i sekunder per fase).
     """
+    import xgboost as xgb
 
-    # Hent historikk
-    df = _fetch_history(db, area, days=60)
-    if df.empty or len(df) < 48:
-        raise ValueError(f"Ikke nok historiske data for {area}")
+    timings = {}
+    t0 = perf_counter()
+    df = price_frame(ts, prices)
 
     # Bygg features
     df_feat = _build_features(df)
     if len(df_feat) < 24:
         raise ValueError("Ikke nok data etter feature engineering")
 
-    feature_cols = ["hour", "day_of_week", "month", "lag_24", "lag_48", "lag_168", "rolling_mean_7d"]
-    X = df_feat[feature_cols].values
+    X = df_feat[FEATURE_COLS].values
     y = df_feat["nok_per_kwh"].values
+    t1 = perf_counter()
+    timings["features"] = t1 - t0
 
     # Tren modellen
     model = xgb.XGBRegressor(
-        n_estimators=200,
-        max_depth=4,
-        learning_rate=0.05,
-        subsample=0.8,
-        colsample_bytree=0.8,
+        **(params or DEFAULT_PARAMS),
         random_state=42,
         verbosity=0,
     )
     model.fit(X, y)
+    t2 = perf_counter()
+    timings["fit"] = t2 - t1
 
-    # Lag prediksjonspunkter for neste 24 timer
-    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
-    tomorrow_midnight = (now + timedelta(days=1)).replace(hour=0)
+    trees = from_booster(model)
+    timings["compile"] = perf_counter() - t2
+    return trees, int(len(df_feat)), timings
 
-    # Hent siste kjente priser for lag-features
-    recent = df["nok_per_kwh"].tail(200)
 
-    points = []
-    for h in range(24):
-        ts = tomorrow_midnight + timedelta(hours=h)
+def _nearest(ts: np.ndarray, target: int) -> int:
+    """Indeks til nærmeste tidspunkt i sortert ts; ved lik avstand det senere (som pandas 'nearest')."""
+    right = int(np.searchsorted(ts, target, side="left"))
+    left = int(np.searchsorted(ts, target, side="right")) - 1
+    if right >= len(ts):
+        return left
+    if left < 0:
+        return right
+    return left if target - ts[left] < ts[right] - target else right
 
-        # Finn lag-verdier fra historikken
-        lag_24_ts = ts - timedelta(hours=24)
-        lag_48_ts = ts - timedelta(hours=48)
-        lag_168_ts = ts - timedelta(hours=168)
 
-        def get_price_at(target_ts):
-            try:
-                idx = recent.index.get_indexer([target_ts], method="nearest")[0]
-                return float(recent.iloc[idx])
-            except Exception:
-                return float(recent.mean())
+def forecast_rows(ts: np.ndarray, prices: np.ndarray, midnight: datetime, recent_rows: int | None = None) -> np.ndarray:
+    """Feature-matrise (24 x FEATURE_COLS) for timene fra midnight, bygget med numpy."""
+    recent_ts = ts if recent_rows is None else ts[-recent_rows:]
+    recent = prices if recent_rows is None else prices[-recent_rows:]
+    hours = (ts // 3600) % 24
 
-        lag_24_val = get_price_at(lag_24_ts)
-        lag_48_val = get_price_at(lag_48_ts)
-        lag_168_val = get_price_at(lag_168_ts)
+    def get_price_at(target: datetime) -> float:
+        return float(recent[_nearest(recent_ts, int(target.timestamp()))])
+
+    rows = []
+    for h in range(24):
+        ts_h = midnight + timedelta(hours=h)
+
+        # Finn lag-verdier fra historikken
+        lag_24_val = get_price_at(ts_h - timedelta(hours=24))
+        lag_48_val = get_price_at(ts_h - timedelta(hours=48))
+        lag_168_val = get_price_at(ts_h - timedelta(hours=168))
 
         # Rullende snitt: gjennomsnittet av samme time siste 7 dager
-        same_hour = df[df.index.hour == h]["nok_per_kwh"].tail(7)
+        same_hour = prices[hours == h][-7:]
         rolling_mean = float(same_hour.mean()) if len(same_hour) > 0 else float(recent.mean())
 
-        features = np.array([[h, ts.weekday(), ts.month, lag_24_val, lag_48_val, lag_168_val, rolling_mean]])
-        predicted_price = float(model.predict(features)[0])
-        predicted_price = max(0.0, round(predicted_price, 4))
+        rows.append([h, ts_h.weekday(), ts_h.month, lag_24_val, lag_48_val, lag_168_val, rolling_mean])
+
+    return np.array(rows, dtype=np.float64)
+
+
+# Sist kompilerte modeller i denne prosessen, så gjentatte kall ikke trener på nytt
+_COMPILED_CACHE_SIZE = 16
+_compiled: OrderedDict = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _train_in_pool(area: str, ts: np.ndarray, prices: np.ndarray) -> tuple[CompiledTrees, int]:
+    # Tunede parametere per område, se app/models/tuning.py
+    params = load_params(area)
+    # Samme område, dataversjon og parametere gir samme modell og deler én kjørende trening
+    key = ("xgboost", area, data_version(ts, prices), tuple(sorted(params.items())))
 
-        points.append({
-            "timestamp": ts.isoformat(),
+    with _compiled_lock:
+        cached = _compiled.get(key)
+        if cached is not None:
+            _compiled.move_to_end(key)
+            return cached
+
+    start = perf_counter()
+    trees, n_samples, timings = run_in_pool(key, train, ts, prices, params)
+    for name, seconds in timings.items():
+        record(name, seconds)
+    # Kø, prosessbytte og overføring av data til og fra poolen
+    record("pool", max(0.0, perf_counter() - start - sum(timings.values())))
+
+    with _compiled_lock:
+        _compiled[key] = (trees, n_samples)
+        while len(_compiled) > _COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return trees, n_samples
+
+
+def warm_up_pool() -> None:
+    """Starter treningspoolen og importerer xgboost, pandas og denne modulen i hver arbeider."""
+    n = pool.warm_up(["xgboost", "pandas", __name__])
+    print(f"[models] xgboost: {n} treningsprosesser klare")
+
+
+def _predict(area: str, ts: np.ndarray, prices: np.ndarray, midnight: datetime,
+             recent_rows: int | None) -> tuple[list[float], int]:
+    trees, n_samples = _train_in_pool(area, ts, prices)
+    with phase("predict"):
+        predicted = trees.predict(forecast_rows(ts, prices, midnight, recent_rows))
+    return [max(0.0, round(float(p), 4)) for p in predicted], n_samples
+
+
+def predict_xgboost(db: Session, area: str) -> list[dict]:
+    """
+    Trener XGBoost på historiske data og predikerer neste 24 timer.
+    Returnerer samme format som baseline for enkel sammenligning.
+    """
+
+    # Hent historikk
+    cutoff = datetime.now(timezone.utc) - timedelta(days=60)
+    ts, prices = load_prices(db, area, start=cutoff)
+    if len(ts) < 48:
+        raise ValueError(f"Ikke nok historiske data for {area}")
+
+    # Lag prediksjonspunkter for neste 24 timer
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    tomorrow_midnight = (now + timedelta(days=1)).replace(hour=0)
+
+    predicted, n_samples = _predict(area, ts, prices, tomorrow_midnight, 200)
+
+    return [
+        {
+            "timestamp": (tomorrow_midnight + timedelta(hours=h)).isoformat(),
             "hour": h,
-            "price_nok_per_kwh": predicted_price,
-            "n_samples": int(len(df_feat)),
-        })
+            "price_nok_per_kwh": predicted[h],
+            "n_samples": n_samples,
+        }
+        for h in range(24)
+    ]
+
+
+def predict_xgboost_arrays(area: str, ts: np.ndarray, prices: np.ndarray, midnight: datetime) -> dict[int, float]:
+    """Trener på arrays med data før midnight og predikerer de 24 timene fra midnight."""
+    if len(ts) < 48:
+        raise ValueError(f"Ikke nok historiske data for evaluering ({len(ts)} rader)")
+
+    predicted, _n = _predict(area, ts, prices, midnight, None)
+    return dict(enumerate(predicted))
+
+
+def predict_xgboost_for_day(db: Session, area: str, today: date) -> dict[int, float]:
+    """XGBoost: trener på data FØR i dag, predikerer i dag."""
+    today_midnight = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
+    cutoff_start = today_midnight - timedelta(days=60)
 
-    return points
\ No newline at end of file
+    ts, prices = load_prices(db, area, start=cutoff_start, end=today_midnight)
+    return predict_xgboost_arrays(area, ts, prices, today_midnight)
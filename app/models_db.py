@@ -1,14 +1,14 @@
 # app/models_db.py
-from sqlalchemy import Column, Integer, String, Date, Float, DateTime, UniqueConstraint, Index
+from sqlalchemy import Column, String, Date, Float, DateTime, Index
 from .db import Base
 
 class SpotPrice(Base):
+    # Skjemaet styres av app/migrations.py (partisjonert per område og måned i Postgres)
     __tablename__ = "spot_prices"
 
-    id = Column(Integer, primary_key=True)
-    area = Column(String(3), nullable=False)          # NO1..NO5
+    area = Column(String(3), primary_key=True)        # NO1..NO5
+    time_start = Column(DateTime(timezone=True), primary_key=True)
     date = Column(Date, nullable=False)               # YYYY-MM-DD (dato for time_start)
-    time_start = Column(DateTime(timezone=True), nullable=False)
     time_end = Column(DateTime(timezone=True), nullable=False)
 
     nok_per_kwh = Column(Float, nullable=True)
@@ -16,6 +16,5 @@ class SpotPrice(Base):
     exr = Column(Float, nullable=True)
 
     __table_args__ = (
-        UniqueConstraint("area", "time_start", name="uq_area_time_start"),
-        Index("ix_spot_prices_area_date", "area", "date"),
+        Index("ix_spot_prices_area_day", "area", "date"),
     )
\ No newline at end of file
@@ -0,0 +1,44 @@
+# app/optimize_api.py
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .areas import parse_areas
+from .db import get_db
+from .models.baseline import VARIANTS
+from .models.registry import get_model
+from .optimizer import optimize
+
+router = APIRouter(tags=["optimize"])
+
+
+@router.get("/optimize/cheapest")
+def cheapest_windows(
+    area: List[str] = Query(["NO1"], description="NO1..NO5 eller 'all'. Kan gjentas"),
+    duration: List[int] = Query(..., description="Varighet i timer. Kan gjentas"),
+    deadline: int = Query(36, ge=1, le=72, description="Timer frem i tid vinduet må være ferdig innen"),
+    model: str = Query("baseline", description="Modell som fyller timer uten publisert pris"),
+    variant: str = Query("mean", description="Baseline-variant når model=baseline"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    areas = parse_areas(area)
+
+    if any(d < 1 or d > deadline for d in duration):
+        raise HTTPException(status_code=400, detail="Varighet må være mellom 1 og deadline")
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Ukjent variant. Bruk {', '.join(VARIANTS)}")
+    try:
+        get_model(model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "ok",
+        "deadline_hours": deadline,
+        "model": model,
+        "variant": variant,
+        "areas": optimize(db, areas, sorted(set(duration)), deadline, variant, model),
+    }
@@ -0,0 +1,191 @@
+# app/optimizer.py
+"""
+Finner billigste tidsrom for et gitt forbruk (f.eks. lading av elbil).
+
+Prisserien per time settes sammen av publiserte spotpriser og, for timer
+som ikke er publisert ennå, prognosen fra en registrert modell (standard
+baseline). Prisene og historikken lastes én gang per område med
+load_prices, uten databasespesifikk SQL.
+
+- cheapest_window: billigste sammenhengende vindu, prefix-sum i O(n)
+- cheapest_slots:  billigste k enkelttimer (ikke nødvendigvis sammenhengende)
+"""
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from sqlalchemy.orm import Session
+
+from app.models.registry import get_model
+
+
+def cheapest_window(prices: list[float | None], k: int) -> tuple[int, float] | None:
+    """
+    Startindeks og snittpris for det billigste sammenhengende vinduet på k
+    elementer. Vinduer som inneholder None hoppes over. Glidende sum i O(n).
+    """
+    if k <= 0 or k > len(prices):
+        return None
+
+    best: tuple[int, float] | None = None
+    window_sum = 0.0
+    missing = 0
+    for i, p in enumerate(prices):
+        if p is None:
+            missing += 1
+        else:
+            window_sum += p
+
+        if i >= k:
+            old = prices[i - k]
+            if old is None:
+                missing -= 1
+            else:
+                window_sum -= old
+
+        if i >= k - 1 and missing == 0 and (best is None or window_sum < best[1]):
+            best = (i - k + 1, window_sum)
+
+    if best is None:
+        return None
+    return best[0], best[1] / k
+
+
+def cheapest_slots(prices: list[float | None], k: int) -> tuple[list[int], float] | None:
+    """Indeksene (sortert på tid) og snittpris for de k billigste elementene som har pris."""
+    available = [i for i, p in enumerate(prices) if p is not None]
+    if k <= 0 or k > len(available):
+        return None
+    idx = heapq.nsmallest(k, available, key=prices.__getitem__)
+    idx.sort()
+    return idx, sum(prices[i] for i in idx) / k
+
+
+def _predictor(model: str, variant: str):
+    """
+    (area, ts, prices, midnight) -> {hour: pris} for modellen, og hvor mange
+    dager historikk den trenger. Baseline får valgt variant.
+    """
+    if model == "baseline":
+        from app.models.baseline import VARIANTS, predict_baseline_arrays
+
+        return partial(predict_baseline_arrays, variant=variant), VARIANTS[variant].days
+    spec = get_model(model)
+    return spec.evaluate_arrays_fn(), spec.history_days
+
+
+def hourly_series(
+    db: Session,
+    areas: list[str],
+    start: datetime,
+    end: datetime,
+    model: str = "baseline",
+    variant: str = "mean",
+) -> dict[str, list[tuple[datetime, float | None, str]]]:
+    """
+    Pris per time i [start, end) for hvert område: (tidspunkt, pris, kilde),
+    der kilde er "actual" for publiserte priser og "forecast" for modellens
+    prognose. Prognosen lages per døgn (UTC) med data før døgnet, så f.eks.
+    weekday-varianten bruker riktig ukedag for hvert døgn. Timer uten pris
+    får pris None.
+    """
+    import numpy as np
+
+    from app.models.loader import load_prices
+
+    predict, history_days = _predictor(model, variant)
+    first_midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    hours = []
+    cur = start
+    while cur < end:
+        hours.append(cur)
+        cur += timedelta(hours=1)
+
+    series: dict[str, list[tuple[datetime, float | None, str]]] = {}
+    for area in areas:
+        # Én lasting per område dekker både publiserte priser og historikken prognosene trenger
+        ts, prices = load_prices(db, area, start=first_midnight - timedelta(days=history_days), end=end)
+
+        # Snitt per time (kvartersoppløsning slås sammen)
+        lo = int(np.searchsorted(ts, start.timestamp()))
+        hour_ts = ts[lo:] - ts[lo:] % 3600
+        actual: dict[int, float] = {}
+        for h in np.unique(hour_ts):
+            actual[int(h)] = float(prices[lo:][hour_ts == h].mean())
+
+        forecast: dict[datetime, dict[int, float]] = {}
+        for midnight in sorted({h.replace(hour=0) for h in hours if int(h.timestamp()) not in actual}):
+            day_lo = int(np.searchsorted(ts, (midnight - timedelta(days=history_days)).timestamp()))
+            day_hi = int(np.searchsorted(ts, midnight.timestamp()))
+            try:
+                forecast[midnight] = predict(area, ts[day_lo:day_hi], prices[day_lo:day_hi], midnight)
+            except ValueError as e:
+                print(f"[optimize] {area} {midnight.date()}: ingen prognose: {e}")
+                forecast[midnight] = {}
+
+        points = []
+        for h in hours:
+            key = int(h.timestamp())
+            day = forecast.get(h.replace(hour=0), {})
+            if key in actual:
+                points.append((h, actual[key], "actual"))
+            elif h.hour in day:
+                points.append((h, day[h.hour], "forecast"))
+            else:
+                points.append((h, None, "missing"))
+        series[area] = points
+    return series
+
+
+def _source(points: list[tuple[datetime, float | None, str]]) -> str:
+    sources = {p[2] for p in points}
+    return sources.pop() if len(sources) == 1 else "mixed"
+
+
+def optimize(
+    db: Session,
+    areas: list[str],
+    durations: list[int],
+    deadline_hours: int = 36,
+    variant: str = "mean",
+    model: str = "baseline",
+) -> dict[str, list[dict]]:
+    """Billigste vindu og billigste enkelttimer for hver kombinasjon av område og varighet."""
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    end = start + timedelta(hours=deadline_hours)
+    series = hourly_series(db, areas, start, end, model, variant)
+
+    result: dict[str, list[dict]] = {}
+    for area in areas:
+        points = series[area]
+        prices = [p[1] for p in points]
+        answers = []
+        for k in durations:
+            answer: dict = {"duration_hours": k, "window": None, "slots": None}
+
+            window = cheapest_window(prices, k)
+            if window is not None:
+                i, avg = window
+                chosen = points[i:i + k]
+                answer["window"] = {
+                    "start": chosen[0][0].isoformat(),
+                    "end": (chosen[-1][0] + timedelta(hours=1)).isoformat(),
+                    "avg_price": round(avg, 4),
+                    "source": _source(chosen),
+                }
+
+            slots = cheapest_slots(prices, k)
+            if slots is not None:
+                idx, avg = slots
+                answer["slots"] = {
+                    "hours": [points[i][0].isoformat() for i in idx],
+                    "avg_price": round(avg, 4),
+                    "source": _source([points[i] for i in idx]),
+                }
+
+            answers.append(answer)
+        result[area] = answers
+    return result
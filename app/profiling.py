@@ -0,0 +1,203 @@
+# app/profiling.py
+"""
+Tidsmåling per fase og opt-in profilering av enkeltforespørsler.
+
+Fasetider: endepunktene starter en Timings med start_timings(), og koden
+under markerer faser med `with phase("query"):` eller record(). Uten aktiv
+Timings er phase() bare ett ContextVar-oppslag.
+
+Profilering: sett PROFILE_TOKEN, og send `X-Profile: <token>` (eller
+`?profile=<token>`). Da samples stakkene til alle tråder som kjører app-kode
+hvert PROFILE_INTERVAL_MS millisekund mens forespørselen pågår, og svaret
+erstattes med stakkene i "folded"-format (én linje per stakk med antall),
+klart for flamegraph.pl eller speedscope. Uten token er middleware-en en
+enkel header-sjekk.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import parse_qs
+
+import orjson
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Timings:
+    def __init__(self) -> None:
+        self.started = perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_ms(self) -> Dict[str, float]:
+        out = {k: round(v * 1000, 2) for k, v in self.phases.items()}
+        out["total"] = round((perf_counter() - self.started) * 1000, 2)
+        return out
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+
+def start_timings() -> Timings:
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - start)
+
+
+def record(name: str, seconds: float) -> None:
+    """Legger til en tid målt et annet sted (f.eks. i treningspoolen)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def run_with(timings: Timings, fn: Callable, *args: Any) -> Any:
+    """
+    Kjører fn med timings som aktiv Timings. Brukes sammen med
+    contextvars.copy_context().run for oppgaver i andre tråder, så hver
+    oppgave får egne fasetider i stedet for å skrive i forespørselens.
+    """
+    _current.set(timings)
+    return fn(*args)
+
+
+def record_parallel(parts: Iterable[Timings]) -> None:
+    """
+    Legger til fasetider fra oppgaver som kjørte samtidig. Per fase tas den
+    lengste oppgaven, ikke summen, så fasene følger veggklokken.
+    """
+    timings = _current.get()
+    if timings is None:
+        return
+    longest: Dict[str, float] = {}
+    for part in parts:
+        for name, seconds in part.phases.items():
+            longest[name] = max(longest.get(name, 0.0), seconds)
+    for name, seconds in longest.items():
+        timings.add(name, seconds)
+
+
+def timed_response(content: Dict[str, Any], timings: Timings):
+    """Legger fasetidene i svaret og serialiseringstiden i Server-Timing-headeren."""
+    from fastapi.responses import Response
+
+    content["timings"] = timings.as_ms()
+
+    start = perf_counter()
+    body = orjson.dumps(content)
+    serialize_ms = (perf_counter() - start) * 1000
+
+    server_timing = ", ".join(
+        f"{name};dur={ms}" for name, ms in {**content["timings"], "serialize": round(serialize_ms, 2)}.items()
+    )
+    return Response(body, media_type="application/json", headers={"Server-Timing": server_timing})
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def finish(self) -> None:
+        self._done.set()
+        self.join()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(_APP_DIR)
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Bare tråder som kjører app-kode er interessante
+                if in_app:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+
+def _profile_requested(scope) -> bool:
+    # Sammenligner bytes: compare_digest avviser str med tegn utenfor ASCII
+    expected = PROFILE_TOKEN.encode()
+    for key, value in scope.get("headers", ()):
+        if key == b"x-profile":
+            return hmac.compare_digest(value, expected)
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        # latin-1 begge veier gir de opprinnelige bytene (også prosent-kodede)
+        token = parse_qs(query.decode("latin-1"), encoding="latin-1").get("profile", [""])[0]
+        return hmac.compare_digest(token.encode("latin-1"), expected)
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: bytter svaret ut med en sample-profil når forespørselen ber om det."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE_TOKEN or scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def capture(message):
+            # Det opprinnelige svaret forkastes; bare statuskoden tas vare på
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        sampler = _Sampler(PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            sampler.finish()
+        elapsed_ms = round((perf_counter() - start) * 1000, 2)
+
+        body = "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()).encode()
+        headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"x-profile-format", b"folded"),
+            (b"x-profile-samples", str(sampler.samples).encode()),
+            (b"x-original-status", str(status["code"]).encode()),
+            (b"server-timing", f"total;dur={elapsed_ms}".encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
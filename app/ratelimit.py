@@ -0,0 +1,222 @@
+# app/ratelimit.py
+"""
+Kostnadsbasert rate limiting med token buckets per klient.
+
+Hver klient (IP, eller adressen foran våre proxyer i X-Forwarded-For
+med RATE_LIMIT_TRUST_PROXY=<antall proxyer>) har en bøtte med RATE_LIMIT_CAPACITY tokens som
+fylles med RATE_LIMIT_REFILL tokens per sekund. Hver forespørsel koster
+tokens etter rute (lengste prefiks i kostnadstabellen vinner), så billige
+oppslag som /spot kan gå jevnt mens trening og evaluering koster mye.
+/api/optimize/* koster minst like mye som prognosen for modellen i
+?model=, siden timer uten publisert pris fylles med den modellen.
+Er det ikke nok tokens svares det 429 med Retry-After.
+
+Konfigurasjon:
+- RATE_LIMIT_BACKEND: memory (standard, per worker), postgres (delt mellom
+  workere via tabellen rate_limit_buckets) eller off
+- RATE_LIMIT_CAPACITY (standard 60) og RATE_LIMIT_REFILL (standard 1.0)
+- RATE_LIMIT_COSTS: overstyrer kostnader, f.eks. "/api/evaluate/=30,/spot=1"
+
+Feiler Postgres slippes forespørselen gjennom.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import orjson
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", "60"))
+RATE_LIMIT_REFILL = float(os.getenv("RATE_LIMIT_REFILL", "1.0"))
+# Antall proxyer foran appen som legger til i X-Forwarded-For (0 = bruk tilkoblingens adresse)
+RATE_LIMIT_TRUST_PROXY = int(os.getenv("RATE_LIMIT_TRUST_PROXY", "0"))
+
+# Kostnad per ruteprefiks. Ruter som ikke står her koster 1
+DEFAULT_COSTS: Dict[str, float] = {
+    "/api/health": 0,
+    "/api/evaluate/": 20,
+    "/api/compare": 20,
+    "/api/forecast/baseline": 2,
+    "/api/forecast/": 10,
+    "/api/optimize/": 2,
+}
+
+
+def parse_costs(value: str) -> Dict[str, float]:
+    costs = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        prefix, _, cost = item.partition("=")
+        try:
+            costs[prefix.strip()] = float(cost)
+        except ValueError:
+            raise ValueError(f"Ugyldig RATE_LIMIT_COSTS-verdi: {item!r}")
+    return costs
+
+
+COSTS = {**DEFAULT_COSTS, **parse_costs(os.getenv("RATE_LIMIT_COSTS", ""))}
+_PREFIXES = sorted(COSTS, key=len, reverse=True)
+
+
+def route_cost(path: str) -> float:
+    for prefix in _PREFIXES:
+        if path.startswith(prefix):
+            return COSTS[prefix]
+    return 1.0
+
+
+def request_cost(path: str, query_string: bytes = b"") -> float:
+    """Kostnaden for forespørselen. Optimize-kall betaler også for modellen som fyller manglende timer."""
+    cost = route_cost(path)
+    if path.startswith("/api/optimize/"):
+        models = parse_qs(query_string.decode("latin-1"), encoding="latin-1").get("model", ["baseline"])
+        cost = max([cost] + [route_cost(f"/api/forecast/{model}") for model in models])
+    return cost
+
+
+def _retry_after(tokens: float, cost: float, rate: float) -> int:
+    return max(1, math.ceil((cost - tokens) / rate))
+
+
+class MemoryBuckets:
+    """Bøtter i prosessminnet. Hver worker teller for seg."""
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, key: str, cost: float) -> int:
+        """Trekker cost tokens. Returnerer 0 hvis tillatt, ellers sekunder til det er nok."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed = True
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed = False
+            self._prune(now)
+        return 0 if allowed else _retry_after(tokens, cost, self.rate)
+
+    def _prune(self, now: float) -> None:
+        # Bøtter som har stått lenge nok til å være fulle igjen trengs ikke
+        full_after = self.capacity / self.rate
+        if now - self._last_prune < full_after:
+            return
+        self._last_prune = now
+        for key, (_tokens, updated) in list(self._buckets.items()):
+            if now - updated > full_after:
+                del self._buckets[key]
+
+
+class PostgresBuckets:
+    """Bøtter i tabellen rate_limit_buckets, delt mellom workere. Én atomisk upsert per forespørsel."""
+
+    _AVAILABLE = (
+        "least(:capacity, b.tokens + "
+        "(extract(epoch from statement_timestamp()) - b.updated_at) * :rate)"
+    )
+    _SQL = (
+        "INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at, allowed) "
+        "VALUES (:key, :capacity - :cost, extract(epoch from statement_timestamp()), true) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        f"tokens = CASE WHEN {_AVAILABLE} >= :cost THEN {_AVAILABLE} - :cost ELSE {_AVAILABLE} END, "
+        f"allowed = {_AVAILABLE} >= :cost, "
+        "updated_at = extract(epoch from statement_timestamp()) "
+        "RETURNING tokens, allowed"
+    )
+
+    def __init__(self, engine, capacity: float, rate: float) -> None:
+        from sqlalchemy import text
+
+        self.engine = engine
+        self.capacity = capacity
+        self.rate = rate
+        self._stmt = text(self._SQL)
+
+    def take(self, key: str, cost: float) -> int:
+        params = {"key": key, "cost": cost, "capacity": self.capacity, "rate": self.rate}
+        try:
+            with self.engine.begin() as conn:
+                tokens, allowed = conn.execute(self._stmt, params).one()
+        except Exception as e:
+            print(f"[ratelimit] postgres feilet, slipper gjennom: {e}")
+            return 0
+        return 0 if allowed else _retry_after(tokens, cost, self.rate)
+
+
+def make_buckets(engine) -> Optional[object]:
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    if RATE_LIMIT_BACKEND == "postgres":
+        if engine.dialect.name != "postgresql":
+            raise RuntimeError("RATE_LIMIT_BACKEND=postgres krever PostgreSQL")
+        return PostgresBuckets(engine, RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL)
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryBuckets(RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL)
+    raise RuntimeError(f"Ukjent RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+
+
+def client_key(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY > 0:
+        forwarded = [
+            addr.strip()
+            for key, value in scope.get("headers", ())
+            if key == b"x-forwarded-for"
+            for addr in value.decode("latin-1").split(",")
+            if addr.strip()
+        ]
+        # Proxyene legger til høyre; alt lenger til venstre kan klienten sette selv
+        if len(forwarded) >= RATE_LIMIT_TRUST_PROXY:
+            return forwarded[-RATE_LIMIT_TRUST_PROXY]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI-middleware: svarer 429 når klienten ikke har tokens nok til ruten."""
+
+    def __init__(self, app, engine) -> None:
+        self.app = app
+        self.buckets = make_buckets(engine)
+
+    async def __call__(self, scope, receive, send):
+        if self.buckets is None or scope["type"] != "http" or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        cost = min(request_cost(scope["path"], scope.get("query_string", b"")), RATE_LIMIT_CAPACITY)
+        if cost <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(scope)
+        if isinstance(self.buckets, PostgresBuckets):
+            from starlette.concurrency import run_in_threadpool
+
+            retry_after = await run_in_threadpool(self.buckets.take, key, cost)
+        else:
+            retry_after = self.buckets.take(key, cost)
+
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        body = orjson.dumps({"status": "rate_limited", "detail": "For mange forespørsler, prøv igjen senere"})
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(retry_after).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 429, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,57 @@
+# app/serialization.py
+"""
+Rask responsvei: bygger JSON direkte fra tuple-rader med orjson.
+
+Endepunktene beholder response_model for dokumentasjon (OpenAPI), men
+returnerer en ORJSONResponse direkte, slik at FastAPI hopper over
+Pydantic-validering og jsonable_encoder per rad. Datetimes i UTC skrives
+med "Z" som hos Pydantic, og naive datetimes (f.eks. fra SQLite) tolkes
+som UTC.
+
+Historikk-endepunktet bygde tidligere svaret selv med datetime.isoformat()
+("+00:00"), og bruker IsoformatJSONResponse for å beholde det formatet.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Sequence, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+ISOFORMAT_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+OPTIONS = ISOFORMAT_OPTIONS | orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+
+class UTCJSONResponse(ORJSONResponse):
+    options = OPTIONS
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=self.options)
+
+
+class IsoformatJSONResponse(UTCJSONResponse):
+    """Datetimes som datetime.isoformat(): "+00:00" for UTC, uten offset for naive verdier."""
+
+    options = ISOFORMAT_OPTIONS
+
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """Gjør om tuple-rader til dicts med gitte nøkler."""
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(
+    content: Any,
+    status_code: int = 200,
+    response_class: Type[UTCJSONResponse] = UTCJSONResponse,
+) -> ORJSONResponse:
+    return response_class(content=content, status_code=status_code)
+
+
+def rows_response(
+    keys: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    response_class: Type[UTCJSONResponse] = UTCJSONResponse,
+) -> ORJSONResponse:
+    """Serialiserer tuple-rader rett til en JSON-liste."""
+    return json_response(rows_to_dicts(keys, rows), response_class=response_class)
@@ -0,0 +1,290 @@
+# app/snapshot.py
+"""
+Delt, minnemappet øyeblikksbilde av nylige priser for alle områder.
+
+Collectoren publiserer de siste PRICE_SNAPSHOT_DAYS dagene med
+(time_start, nok_per_kwh) for alle områdene til én fil. Filen skrives
+ferdig ved siden av og byttes inn med os.replace, så den er uforanderlig
+når den først er synlig. Hver worker mapper filen read-only; arrayene er
+numpy-views rett inn i mappingen, så sidene deles via page cache og minnet
+er det samme uansett antall workere.
+
+Workerne sjekker filen (inode) høyst én gang per sekund og bytter til ny
+versjon med én referansetilordning. Gamle views er gyldige til de slippes.
+load_prices bruker snapshotet når det dekker intervallet og ikke er eldre
+enn PRICE_SNAPSHOT_MAX_AGE sekunder, ellers databasen.
+
+Nye rader meldes med mark_changed (fra NOTIFY-lytteren i app/events.py).
+Et snapshot laget før endringen brukes da ikke for området, og workeren
+publiserer et nytt etter PRICE_SNAPSHOT_REFRESH_DELAY sekunder. En låsefil
+ved siden av snapshotet sørger for at bare én worker per maskin publiserer
+om gangen, og de andre hopper over når filen allerede er ny nok.
+
+Filformat (little endian):
+    header: magic "F24SNAP1", versjon u64, opprettet f64 (epoch),
+            vindu-start i64 (epoch), antall områder u32, 4 byte fyll
+    katalog per område: navn 8s, offset u64, antall u64
+    data per område: time_start i64[antall], nok_per_kwh f64[antall]
+
+    python -m app.snapshot publish
+    python -m app.snapshot info
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .areas import AREAS
+
+PRICE_SNAPSHOT_PATH = os.getenv("PRICE_SNAPSHOT_PATH", os.path.join("data", "prices.snapshot"))
+PRICE_SNAPSHOT_DAYS = int(os.getenv("PRICE_SNAPSHOT_DAYS", "70"))
+PRICE_SNAPSHOT_MAX_AGE = float(os.getenv("PRICE_SNAPSHOT_MAX_AGE", "86400"))
+PRICE_SNAPSHOT_REFRESH_DELAY = float(os.getenv("PRICE_SNAPSHOT_REFRESH_DELAY", "5"))
+
+_MAGIC = b"F24SNAP1"
+_HEADER = struct.Struct("<8sQdqI4x")
+_ENTRY = struct.Struct("<8sQQ")
+
+# Hvor ofte (sekunder) en worker ser etter ny fil
+_CHECK_INTERVAL = 1.0
+
+
+class Snapshot:
+    """Read-only mapping av én snapshot-fil."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.inode = (st.st_dev, st.st_ino)
+
+        magic, self.version, self.created, self.window_start, n_areas = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Ugyldig snapshot-fil: {path}")
+
+        self.series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for i in range(n_areas):
+            name, offset, count = _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+            area = name.rstrip(b"\0").decode()
+            if count == 0:
+                self.series[area] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+                continue
+            ts = np.frombuffer(self._mm, dtype="<i8", count=count, offset=offset)
+            prices = np.frombuffer(self._mm, dtype="<f8", count=count, offset=offset + 8 * count)
+            self.series[area] = (ts, prices)
+
+    def prices(
+        self,
+        area: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Som load_prices for [start, end), eller None hvis snapshotet ikke dekker forespørselen."""
+        if area not in self.series or start is None or start.timestamp() < self.window_start:
+            return None
+        if time.time() - self.created > PRICE_SNAPSHOT_MAX_AGE:
+            return None
+        if _changed.get(area, 0.0) >= self.created:
+            return None
+
+        ts, prices = self.series[area]
+        lo = int(np.searchsorted(ts, start.timestamp(), side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end.timestamp(), side="left"))
+        return ts[lo:hi], prices[lo:hi]
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "created": datetime.fromtimestamp(self.created, timezone.utc).isoformat(),
+            "window_start": datetime.fromtimestamp(self.window_start, timezone.utc).isoformat(),
+            "rows": {area: int(len(ts)) for area, (ts, _p) in self.series.items()},
+            "bytes": len(self._mm),
+        }
+
+
+_current: Optional[Snapshot] = None
+_checked = 0.0
+_lock = threading.Lock()
+
+# Når (epoch) denne workeren sist fikk melding om nye rader per område
+_changed: Dict[str, float] = {}
+_refresh_timer: Optional[threading.Timer] = None
+
+
+def current() -> Optional[Snapshot]:
+    """Gjeldende snapshot for denne workeren, eller None hvis det ikke finnes."""
+    global _current, _checked
+    if not PRICE_SNAPSHOT_PATH:
+        return None
+
+    now = time.monotonic()
+    if now - _checked < _CHECK_INTERVAL:
+        return _current
+
+    with _lock:
+        if now - _checked < _CHECK_INTERVAL:
+            return _current
+        _checked = now
+        try:
+            st = os.stat(PRICE_SNAPSHOT_PATH)
+        except FileNotFoundError:
+            _current = None
+            return None
+        if _current is None or _current.inode != (st.st_dev, st.st_ino):
+            try:
+                _current = Snapshot(PRICE_SNAPSHOT_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"[snapshot] kunne ikke lese {PRICE_SNAPSHOT_PATH}: {e}")
+                _current = None
+        return _current
+
+
+def mark_changed(area: Optional[str] = None, refresh: bool = True) -> None:
+    """
+    Melder at området (alle områder når area er None) har fått nye rader.
+    Snapshot laget før dette brukes ikke for området, og med refresh
+    publiseres et nytt i bakgrunnen.
+    """
+    now = time.time()
+    with _lock:
+        for a in [area] if area else AREAS:
+            _changed[a] = now
+    if refresh:
+        refresh_soon()
+
+
+def refresh_soon(delay: float = PRICE_SNAPSHOT_REFRESH_DELAY) -> None:
+    """Publiserer et nytt snapshot om delay sekunder. Kall i mellomtiden slås sammen."""
+    global _refresh_timer
+    if not PRICE_SNAPSHOT_PATH:
+        return
+    with _lock:
+        if _refresh_timer is not None and _refresh_timer.is_alive():
+            return
+        _refresh_timer = threading.Timer(delay, _refresh)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
+
+
+def _refresh() -> None:
+    """Publiserer under låsefilen, med mindre en annen worker allerede har publisert etter endringene."""
+    import fcntl
+
+    directory = os.path.dirname(PRICE_SNAPSHOT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        with open(PRICE_SNAPSHOT_PATH + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            changed = max(_changed.values(), default=0.0)
+            try:
+                if Snapshot(PRICE_SNAPSHOT_PATH).created > changed:
+                    return
+            except (OSError, ValueError, struct.error):
+                pass
+            publish()
+    except Exception as e:
+        print(f"[snapshot] publisering feilet: {e}")
+
+
+def write(path: str, series: Dict[str, Tuple[np.ndarray, np.ndarray]], window_start: int,
+          created: Optional[float] = None) -> int:
+    """
+    Skriver et snapshot atomisk og returnerer versjonen. created er når
+    dataene ble lest (standard nå); endringer etter det gjør snapshotet
+    utdatert for området.
+    """
+    version = time.time_ns()
+    offset = _HEADER.size + len(series) * _ENTRY.size
+    offset += -offset % 8
+
+    created = time.time() if created is None else created
+    header = bytearray(_HEADER.pack(_MAGIC, version, created, window_start, len(series)))
+    data = bytearray()
+    for area, (ts, prices) in series.items():
+        header += _ENTRY.pack(area.encode(), offset + len(data), len(ts))
+        data += np.ascontiguousarray(ts, dtype="<i8").tobytes()
+        data += np.ascontiguousarray(prices, dtype="<f8").tobytes()
+    header += b"\0" * (-len(header) % 8)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return version
+
+
+def publish(days: int = PRICE_SNAPSHOT_DAYS, path: str = PRICE_SNAPSHOT_PATH) -> Optional[int]:
+    """Leser de siste `days` dagene for alle områdene i én spørring og publiserer dem."""
+    if not path:
+        return None
+
+    from sqlalchemy import Float, cast, func, select
+
+    from .db import SessionLocal
+    from .models_db import SpotPrice
+
+    # Tidspunktet før spørringen, så rader som kommer underveis regnes som nyere
+    created = time.time()
+    window_start = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp())
+    epoch = cast(func.extract("epoch", SpotPrice.time_start), Float)
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(SpotPrice.area, epoch, SpotPrice.nok_per_kwh)
+            .where(SpotPrice.area.in_(AREAS))
+            .where(SpotPrice.time_start >= datetime.fromtimestamp(window_start, timezone.utc))
+            .where(SpotPrice.nok_per_kwh.isnot(None))
+            .order_by(SpotPrice.area.asc(), SpotPrice.time_start.asc())
+        ).all()
+    finally:
+        db.close()
+
+    grouped: Dict[str, list] = {a: [] for a in AREAS}
+    for area, ts, price in rows:
+        grouped[area].append((ts, price))
+
+    series = {}
+    for area, values in grouped.items():
+        arr = np.array(values, dtype=np.float64).reshape(-1, 2)
+        series[area] = (arr[:, 0].astype(np.int64), arr[:, 1])
+
+    version = write(path, series, window_start, created)
+    print(f"[snapshot] publisert versjon {version}: {len(rows)} rader")
+    return version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delt snapshot av nylige priser")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_publish = sub.add_parser("publish", help="les fra databasen og publiser et nytt snapshot")
+    p_publish.add_argument("--days", type=int, default=PRICE_SNAPSHOT_DAYS)
+    sub.add_parser("info", help="vis gjeldende snapshot")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        if not os.getenv("DATABASE_URL"):
+            raise RuntimeError("DATABASE_URL mangler")
+        publish(args.days)
+    else:
+        snap = current()
+        print(snap.info() if snap is not None else f"Ingen snapshot i {PRICE_SNAPSHOT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
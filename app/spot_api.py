@@ -1,17 +1,31 @@
 # app/spot_api.py
 from datetime import date, datetime, time, timezone, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
 
+from .areas import group_by_area, is_single_area, parse_areas
 from .db import get_db
 from .models_db import SpotPrice
+from .serialization import json_response, rows_response, rows_to_dicts
 
 router = APIRouter(prefix="/spot", tags=["spot"])
 
+SPOT_KEYS = ("area", "date", "time_start", "time_end", "nok_per_kwh", "eur_per_kwh", "exr")
+SPOT_COLUMNS = (
+    SpotPrice.area,
+    SpotPrice.date,
+    SpotPrice.time_start,
+    SpotPrice.time_end,
+    SpotPrice.nok_per_kwh,
+    SpotPrice.eur_per_kwh,
+    SpotPrice.exr,
+)
+
 class SpotPriceOut(BaseModel):
     area: str
     date: date
@@ -28,46 +42,71 @@ def _day_range_utc(d: date):
     # DB lagrer timestart som tz-aware; vi filtrerer på dato-kolonnen 
     return d
 
-@router.get("", response_model=List[SpotPriceOut])
+def _respond(areas: List[str], single: bool, rows) -> ORJSONResponse:
+    """Én område gir en flat liste som før; flere områder grupperes per område."""
+    if single:
+        return rows_response(SPOT_KEYS, rows)
+    return json_response(group_by_area(areas, rows_to_dicts(SPOT_KEYS, rows)))
+
+
+@router.get("", response_model=Union[List[SpotPriceOut], Dict[str, List[SpotPriceOut]]])
 def get_spot_prices_for_day(
-    area: str = Query(..., min_length=3, max_length=3, description="NO1..NO5"),
+    area: List[str] = Query(..., description="NO1..NO5, kommaseparert/gjentatt, eller 'all'"),
     d: date = Query(..., alias="date", description="YYYY-MM-DD"),
     db: Session = Depends(get_db),
 ):
+    areas = parse_areas(area)
     q = (
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
+        select(*SPOT_COLUMNS)
+        .where(SpotPrice.area.in_(areas))
         .where(SpotPrice.date == d)
-        .order_by(SpotPrice.time_start.asc())
+        .order_by(SpotPrice.area.asc(), SpotPrice.time_start.asc())
     )
-    rows = db.execute(q).scalars().all()
+    rows = db.execute(q).all()
     if not rows:
         raise HTTPException(status_code=404, detail="Ingen priser funnet for area+date")
-    return rows
+    return _respond(areas, is_single_area(area), rows)
+
+
+# Hvor langt tilbake /spot/latest ser etter siste pris før den søker i hele tabellen
+LATEST_LOOKBACK_DAYS = 14
+
+
+def _latest_rows(db: Session, areas: List[str], hours: int, floor: Optional[datetime]):
+    """Siste `hours` timer per område: først max(time_start) per område, så radene fra grensen."""
+    last = select(SpotPrice.area, func.max(SpotPrice.time_start)).where(SpotPrice.area.in_(areas))
+    if floor is not None:
+        last = last.where(SpotPrice.time_start >= floor)
+    last_ts = db.execute(last.group_by(SpotPrice.area)).all()
+    if not last_ts:
+        return []
+
+    # Grensen regnes ut her og ikke i SQL, så sammenligningen blir lik på alle databaser
+    window = or_(*(
+        and_(SpotPrice.area == a, SpotPrice.time_start >= ts - timedelta(hours=hours - 1))
+        for a, ts in last_ts
+    ))
+    q = select(*SPOT_COLUMNS).where(window).order_by(SpotPrice.area.asc(), SpotPrice.time_start.asc())
+    return db.execute(q).all()
 
-@router.get("/latest", response_model=List[SpotPriceOut])
+
+@router.get("/latest", response_model=Union[List[SpotPriceOut], Dict[str, List[SpotPriceOut]]])
 def get_latest_spot_prices(
-    area: str = Query(..., min_length=3, max_length=3),
+    area: List[str] = Query(..., description="NO1..NO5, kommaseparert/gjentatt, eller 'all'"),
     hours: int = Query(48, ge=1, le=168),
     db: Session = Depends(get_db),
 ):
-    
-    last_ts = db.execute(
-        select(SpotPrice.time_start)
-        .where(SpotPrice.area == area)
-        .order_by(SpotPrice.time_start.desc())
-        .limit(1)
-    ).scalar_one_or_none()
-
-    if last_ts is None:
-        raise HTTPException(status_code=404, detail="Ingen priser funnet for area")
+    areas = parse_areas(area)
 
-    since = last_ts - timedelta(hours=hours - 1)
+    floor = datetime.now(timezone.utc) - timedelta(hours=hours, days=LATEST_LOOKBACK_DAYS)
+    rows = _latest_rows(db, areas, hours, floor)
 
-    q = (
-        select(SpotPrice)
-        .where(SpotPrice.area == area)
-        .where(SpotPrice.time_start >= since)
-        .order_by(SpotPrice.time_start.asc())
-    )
-    return db.execute(q).scalars().all()
\ No newline at end of file
+    # Områder uten ferske data (f.eks. stoppet innsamling): søk uten nedre grense
+    found = {r.area for r in rows}
+    stale = [a for a in areas if a not in found]
+    if stale:
+        rows = sorted(rows + _latest_rows(db, stale, hours, None), key=lambda r: (r.area, r.time_start))
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="Ingen priser funnet for area")
+    return _respond(areas, is_single_area(area), rows)
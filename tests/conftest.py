@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+# Må settes før app-modulene importeres (de leser env ved import)
+_tmp = tempfile.mkdtemp(prefix="forecast24-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'test.db')}")
+os.environ.setdefault("RAW_ARCHIVE_DIR", os.path.join(_tmp, "raw"))
+os.environ.setdefault("PRICE_SNAPSHOT_PATH", os.path.join(_tmp, "prices.snapshot"))
+os.environ.setdefault("XGBOOST_PARAMS_PATH", os.path.join(_tmp, "xgboost_params.json"))
+
+
+@pytest.fixture
+def db():
+    """Sesjon mot test-databasen (SQLite); spot_prices tømmes etter hver test."""
+    pytest.importorskip("sqlalchemy")
+    from app.db import SessionLocal, engine
+    from app.migrations import migrate
+    from app.models_db import SpotPrice
+
+    migrate(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.query(SpotPrice).delete()
+        session.commit()
+        session.close()
@@ -0,0 +1,43 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import archive
+
+
+def _payload(day: str) -> bytes:
+    return json.dumps([
+        {
+            "NOK_per_kWh": 0.5 + h / 100,
+            "EUR_per_kWh": 0.05,
+            "EXR": 10.0,
+            "time_start": f"{day}T{h:02d}:00:00+01:00",
+            "time_end": f"{day}T{h + 1:02d}:00:00+01:00" if h < 23 else f"{day}T23:59:59+01:00",
+        }
+        for h in range(24)
+    ]).encode()
+
+
+def test_put_and_get_roundtrip():
+    raw = _payload("2025-01-15")
+    digest = archive.put("NO2", date(2025, 1, 15), raw)
+    assert archive.get("NO2", date(2025, 1, 15)) == raw
+    assert archive.get("NO2", date(2025, 1, 16)) is None
+    assert len(digest) == 64
+
+
+def test_replay_first_day_of_month_covers_previous_utc_month(db, monkeypatch):
+    from app import migrations
+
+    calls = []
+    monkeypatch.setattr(migrations, "ensure_partitions", lambda conn, start, end, **kw: calls.append((start, end)))
+
+    archive.put("NO1", date(2025, 3, 1), _payload("2025-03-01"))
+    assert archive.replay(["NO1"], date(2025, 3, 1), date(2025, 3, 1)) == 24
+
+    # 2025-03-01 00:00 i Norge er 2025-02-28 23:00 UTC, som havner i februar-partisjonen
+    (start, end), = calls
+    months = migrations.partition_months(start, end)
+    assert date(2025, 2, 1) in months
+    assert date(2025, 3, 1) in months
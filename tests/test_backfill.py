@@ -0,0 +1,83 @@
+import json
+from datetime import date
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app import backfill  # noqa: E402
+from app.backfill import Checkpoint, _month_chunks, backfill_range  # noqa: E402
+
+
+class _NotFound(Exception):
+    def __init__(self) -> None:
+        super().__init__("404 Client Error")
+        self.response = type("Response", (), {"status_code": 404})()
+
+
+def _payload(d: date) -> list:
+    return [{
+        "NOK_per_kWh": 0.5,
+        "time_start": f"{d.isoformat()}T00:00:00+01:00",
+        "time_end": f"{d.isoformat()}T01:00:00+01:00",
+    }]
+
+
+def test_checkpoint_persists_per_job(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, "a").mark("NO1:2025-01")
+    Checkpoint(path, "b").mark("NO2:2025-01")
+
+    assert Checkpoint(path, "a").done == {"NO1:2025-01"}
+    assert Checkpoint(path, "a", restart=True).done == set()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"a": ["NO1:2025-01"], "b": ["NO2:2025-01"]}
+
+
+def test_month_chunks():
+    assert list(_month_chunks(date(2024, 12, 15), date(2025, 2, 3))) == [
+        (date(2024, 12, 15), date(2024, 12, 31)),
+        (date(2025, 1, 1), date(2025, 1, 31)),
+        (date(2025, 2, 1), date(2025, 2, 3)),
+    ]
+    assert list(_month_chunks(date(2025, 3, 5), date(2025, 3, 5))) == [(date(2025, 3, 5), date(2025, 3, 5))]
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    rows = []
+    monkeypatch.setattr(backfill, "load_rows", lambda r, replace=False: rows.extend(r) or len(r))
+    return rows
+
+
+def test_failed_day_leaves_month_unmarked(tmp_path, monkeypatch, loaded):
+    def fetch_day(area, d):
+        if d == date(2025, 1, 2):
+            raise TimeoutError("timeout")
+        return _payload(d)
+
+    monkeypatch.setattr(backfill, "fetch_day", fetch_day)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), "job")
+
+    assert backfill_range(["NO1"], date(2025, 1, 1), date(2025, 2, 2), checkpoint, fetch_workers=2) == 32
+    # Januar hadde en feilet dag og hentes igjen ved neste kjøring; februar er ferdig
+    assert Checkpoint(checkpoint.path, "job").done == {"NO1:2025-02"}
+
+    monkeypatch.setattr(backfill, "fetch_day", lambda area, d: _payload(d))
+    loaded.clear()
+    backfill_range(["NO1"], date(2025, 1, 1), date(2025, 2, 2), Checkpoint(checkpoint.path, "job"))
+    assert len(loaded) == 31
+    assert Checkpoint(checkpoint.path, "job").done == {"NO1:2025-01", "NO1:2025-02"}
+
+
+def test_days_without_data_count_as_complete(tmp_path, monkeypatch, loaded):
+    def fetch_day(area, d):
+        if d.day == 1:
+            raise _NotFound()
+        return [] if d.day == 2 else _payload(d)
+
+    monkeypatch.setattr(backfill, "fetch_day", fetch_day)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), "job")
+
+    assert backfill_range(["NO1"], date(2025, 1, 1), date(2025, 1, 3), checkpoint) == 1
+    assert checkpoint.done == {"NO1:2025-01"}
@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from app.models.baseline import aggregate_arrays, predict_baseline_arrays  # noqa: E402
+
+END = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+
+def _series(days: int):
+    start = int((END - timedelta(days=days)).timestamp())
+    ts = np.arange(start, int(END.timestamp()), 3600, dtype=np.int64)
+    # Pris = dager siden start + time/100, så aggregatene kan regnes for hånd
+    prices = (ts - start) // 86400 + (ts // 3600 % 24) / 100
+    return ts, prices.astype(np.float64)
+
+
+def test_mean_uses_last_seven_days_per_hour():
+    ts, prices = _series(30)
+    hourly = aggregate_arrays("mean", ts, prices, END.date(), END)
+
+    assert sorted(hourly) == list(range(24))
+    # Dag 23..29 i vinduet: snitt 26
+    assert hourly[5] == (round(26 + 0.05, 4), 7)
+
+
+def test_window_excludes_end_and_later_rows():
+    ts, prices = _series(30)
+    later = ts + 30 * 86400
+    hourly = aggregate_arrays("mean", np.concatenate([ts, later]), np.concatenate([prices, prices + 100]),
+                              END.date(), END)
+    assert hourly[0][0] < 100
+
+
+def test_weekday_uses_only_same_weekday():
+    ts, prices = _series(60)
+    target = date(2025, 3, 10)  # mandag
+    hourly = aggregate_arrays("weekday", ts, prices, target, END)
+
+    # Fire mandager i 28-dagersvinduet: 10., 17. og 24. februar og 3. mars,
+    # som er dag 32, 39, 46 og 53 etter seriestart 9. januar
+    assert hourly[0] == (42.5, 4)
+
+
+def test_ewm_weights_recent_days_more_than_mean():
+    ts, prices = _series(30)
+    mean = aggregate_arrays("mean", ts, prices, END.date(), END)
+    ewm = aggregate_arrays("ewm", ts, prices, END.date(), END)
+    # Stigende priser: vektet snitt ligger over det flate snittet
+    assert ewm[12][0] > mean[12][0]
+
+
+def test_predict_baseline_arrays_matches_mean_variant():
+    ts, prices = _series(10)
+    hourly = aggregate_arrays("mean", ts, prices, END.date(), END)
+    assert predict_baseline_arrays("NO1", ts, prices, END) == {h: p for h, (p, _n) in hourly.items()}
+
+
+def test_unknown_variant():
+    ts, prices = _series(10)
+    with pytest.raises(ValueError):
+        aggregate_arrays("nope", ts, prices, END.date(), END)
@@ -0,0 +1,109 @@
+import sys
+import types
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from app.models import evaluator, loader, registry  # noqa: E402
+from app.models.evaluator import compare_models  # noqa: E402
+from app.models.pool import PoolBusy  # noqa: E402
+from app.models.registry import ModelSpec  # noqa: E402
+
+DAY = date(2026, 10, 19)
+MIDNIGHT = datetime(2026, 10, 19, tzinfo=timezone.utc)
+ACTUAL = {h: 1.0 for h in range(24)}
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Modellene "short" (2 dager) og "long" (5 dager) husker utsnittet de fikk; "broken" og "busy" feiler."""
+    seen = {}
+
+    def constant(value, model_id):
+        def evaluate_arrays(area, ts, prices, midnight):
+            seen[model_id, area] = (int(ts[0]), len(ts), len(prices))
+            return {h: value for h in range(24)}
+        return evaluate_arrays
+
+    def broken(area, ts, prices, midnight):
+        raise ValueError("Ikke nok historiske data")
+
+    def busy(area, ts, prices, midnight):
+        raise PoolBusy(retry_after=3)
+
+    module = types.ModuleType("fake_compare_models")
+    module.short = constant(1.5, "short")
+    module.long = constant(1.1, "long")
+    module.broken = broken
+    module.busy = busy
+    monkeypatch.setitem(sys.modules, "fake_compare_models", module)
+
+    for model_id, days in (("short", 2), ("long", 5), ("broken", 1), ("busy", 1)):
+        monkeypatch.setitem(registry._registry, model_id, ModelSpec(
+            model_id=model_id, name=model_id, description="", module="fake_compare_models",
+            forecast="-", evaluate="-", evaluate_arrays=model_id, history_days=days,
+        ))
+
+    loads = []
+
+    def load_prices(db, area, start=None, end=None):
+        loads.append((area, start, end))
+        # Timesdata fra start frem til end
+        ts = np.arange(int(start.timestamp()), int(end.timestamp()), 3600, dtype=np.int64)
+        return ts, np.ones(len(ts))
+
+    monkeypatch.setattr(loader, "load_prices", load_prices)
+    monkeypatch.setattr(evaluator, "_get_actual_today", lambda db, area, day: dict(ACTUAL))
+    yield seen, loads
+    registry._loaded.pop("fake_compare_models", None)
+
+
+def test_history_is_loaded_once_and_sliced_per_model(fake_models):
+    seen, loads = fake_models
+    compare_models(None, ["short", "long"], ["NO1", "NO2"], DAY)
+
+    # Én last per område for det lengste vinduet
+    assert loads == [(area, MIDNIGHT - timedelta(days=5), MIDNIGHT) for area in ("NO1", "NO2")]
+    for area in ("NO1", "NO2"):
+        assert seen["short", area] == (int((MIDNIGHT - timedelta(days=2)).timestamp()), 48, 48)
+        assert seen["long", area] == (int((MIDNIGHT - timedelta(days=5)).timestamp()), 120, 120)
+
+
+def test_models_are_scored_and_ranked_by_mae(fake_models):
+    result = compare_models(None, ["short", "long"], ["NO1"], DAY)
+
+    area = result["areas"]["NO1"]
+    assert result["models"] == ["short", "long"]
+    assert area["status"] == "ok"
+    assert area["ranking"] == ["long", "short"]
+    assert area["models"]["short"]["metrics"]["mae"] == 0.5
+    assert area["points"][0] == {"hour": 0, "time": "00:00", "actual": 1.0, "short": 1.5, "long": 1.1}
+
+
+def test_failing_model_does_not_hide_the_others(fake_models):
+    result = compare_models(None, ["broken", "short"], ["NO1"], DAY)
+
+    models = result["areas"]["NO1"]["models"]
+    assert models["broken"] == {"status": "error", "detail": "Ikke nok historiske data"}
+    assert models["short"]["status"] == "ok"
+    assert result["areas"]["NO1"]["ranking"] == ["short"]
+    assert "broken" not in result["areas"]["NO1"]["points"][0]
+
+
+def test_pool_busy_is_passed_through(fake_models):
+    with pytest.raises(PoolBusy) as exc:
+        compare_models(None, ["short", "busy"], ["NO1"], DAY)
+    assert exc.value.retry_after == 3
+
+
+def test_incomplete_day_has_no_metrics(fake_models, monkeypatch):
+    monkeypatch.setattr(evaluator, "_get_actual_today", lambda db, area, day: {h: 1.0 for h in range(20)})
+    area = compare_models(None, ["short"], ["NO1"], DAY)["areas"]["NO1"]
+
+    assert area["status"] == "incomplete"
+    assert area["hours_available"] == 20
+    assert area["models"]["short"] == {"status": "no_metrics"}
+    assert area["ranking"] == []
@@ -0,0 +1,38 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app import events  # noqa: E402
+from app.events import format_sse, notify_new_day  # noqa: E402
+
+
+@pytest.fixture
+def published(monkeypatch):
+    sent = []
+    monkeypatch.setattr(events, "_on_new_day", sent.append)
+    return sent
+
+
+def test_event_is_delivered_on_commit(db, published):
+    notify_new_day(db, "NO1", date(2026, 10, 19), 24)
+    assert published == []
+    db.commit()
+    assert published == [{"area": "NO1", "date": "2026-10-19", "rows": 24}]
+
+    db.commit()
+    assert len(published) == 1
+
+
+def test_rolled_back_event_is_not_delivered_with_next_commit(db, published):
+    db.connection()  # som i collect_area: transaksjonen er i gang før rollback
+    notify_new_day(db, "NO1", date(2026, 10, 19), 24)
+    db.rollback()
+    notify_new_day(db, "NO1", date(2026, 10, 20), 23)
+    db.commit()
+    assert published == [{"area": "NO1", "date": "2026-10-20", "rows": 23}]
+
+
+def test_format_sse():
+    assert format_sse({"area": "NO1"}) == b'event: prices\ndata: {"area":"NO1"}\n\n'
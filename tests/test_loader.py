@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from app import snapshot  # noqa: E402
+from app.models.loader import load_prices, price_frame  # noqa: E402
+from app.models_db import SpotPrice  # noqa: E402
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _add_hours(db, area, n, missing=()):
+    for h in range(n):
+        ts = START + timedelta(hours=h)
+        db.add(SpotPrice(area=area, date=ts.date(), time_start=ts, time_end=ts + timedelta(hours=1),
+                         nok_per_kwh=None if h in missing else float(h)))
+    db.commit()
+
+
+def test_load_prices_interval_and_types(db):
+    _add_hours(db, "NO1", 48, missing={5})
+    _add_hours(db, "NO2", 48)
+
+    ts, prices = load_prices(db, "NO1", START + timedelta(hours=2), START + timedelta(hours=8))
+
+    assert ts.dtype == np.int64 and prices.dtype == np.float64
+    # [start, end), sortert på tid, uten timer uten pris
+    assert prices.tolist() == [2.0, 3.0, 4.0, 6.0, 7.0]
+    assert ts[0] == int((START + timedelta(hours=2)).timestamp())
+    assert np.all(np.diff(ts) > 0)
+
+
+def test_load_prices_without_bounds_and_empty(db):
+    _add_hours(db, "NO1", 24)
+    assert len(load_prices(db, "NO1")[0]) == 24
+
+    ts, prices = load_prices(db, "NO3")
+    assert len(ts) == 0 and ts.dtype == np.int64
+    assert len(prices) == 0 and prices.dtype == np.float64
+
+
+def test_load_prices_reads_covering_snapshot_without_database(monkeypatch):
+    hit = (np.array([1, 2], dtype=np.int64), np.array([0.5, 0.6]))
+
+    class FakeSnapshot:
+        def prices(self, area, start, end):
+            return hit if area == "NO1" else None
+
+    monkeypatch.setattr(snapshot, "current", lambda: FakeSnapshot())
+    assert load_prices(None, "NO1", START) is hit
+
+
+def test_price_frame():
+    pd = pytest.importorskip("pandas")
+    ts = np.array([int(START.timestamp()), int(START.timestamp()) + 3600], dtype=np.int64)
+    df = price_frame(ts, np.array([1.0, 2.0]))
+
+    assert df.index.name == "time_start"
+    assert df.index[0] == pd.Timestamp(START)
+    assert str(df.index.tz) == "UTC"
+    assert df["nok_per_kwh"].tolist() == [1.0, 2.0]
+    assert price_frame(ts[:0], np.empty(0)).empty
@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.migrations import ensure_partitions, next_month, partition_months, partition_span  # noqa: E402
+
+CET = timezone(timedelta(hours=1))
+CEST = timezone(timedelta(hours=2))
+
+
+def _local_day_utc_hours(d: date, tz: timezone) -> list[datetime]:
+    """time_start (UTC) for de 24 timene i en norsk dag."""
+    midnight = datetime(d.year, d.month, d.day, tzinfo=tz)
+    return [(midnight + timedelta(hours=h)).astimezone(timezone.utc) for h in range(24)]
+
+
+def _covered(months: list[date], ts: datetime) -> bool:
+    return any(datetime(m.year, m.month, 1, tzinfo=timezone.utc) <= ts
+               < datetime(next_month(m).year, next_month(m).month, 1, tzinfo=timezone.utc) for m in months)
+
+
+def test_partition_months():
+    assert partition_months(date(2024, 12, 15), date(2025, 2, 1)) == [
+        date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1),
+    ]
+    assert partition_months(date(2025, 3, 1), date(2025, 3, 31)) == [date(2025, 3, 1)]
+
+
+@pytest.mark.parametrize("day, tz", [
+    (date(2025, 3, 1), CET),    # første time er 28. februar 23:00 UTC
+    (date(2025, 7, 1), CEST),   # første time er 30. juni 22:00 UTC
+    (date(2025, 1, 1), CET),    # over årsskiftet
+    (date(2025, 3, 31), CEST),
+])
+def test_span_covers_first_and_last_day_of_month(day, tz):
+    months = partition_months(*partition_span(day, day))
+    assert all(_covered(months, ts) for ts in _local_day_utc_hours(day, tz))
+
+
+def test_without_margin_first_day_of_month_is_not_covered():
+    # Slik replay kalte ensure_partitions før: raden fra 28. februar 23:00 UTC havner utenfor
+    day = date(2025, 3, 1)
+    assert not _covered(partition_months(day, day), _local_day_utc_hours(day, CET)[0])
+
+
+class _FakeConn:
+    def __init__(self, dialect: str) -> None:
+        self.dialect = type("Dialect", (), {"name": dialect})()
+        self.statements: list[str] = []
+
+    def execute(self, clause, params=None):
+        self.statements.append(str(clause))
+
+
+def test_ensure_partitions_ddl_uses_utc_month_bounds():
+    conn = _FakeConn("postgresql")
+    ensure_partitions(conn, *partition_span(date(2025, 3, 1), date(2025, 3, 1)), areas=["NO1"], parent="spot_prices")
+
+    assert conn.statements == [
+        "CREATE TABLE IF NOT EXISTS spot_prices_no1_2025_02 PARTITION OF spot_prices_no1 "
+        "FOR VALUES FROM ('2025-02-01T00:00:00+00:00') TO ('2025-03-01T00:00:00+00:00')",
+        "CREATE TABLE IF NOT EXISTS spot_prices_no1_2025_03 PARTITION OF spot_prices_no1 "
+        "FOR VALUES FROM ('2025-03-01T00:00:00+00:00') TO ('2025-04-01T00:00:00+00:00')",
+    ]
+
+
+def test_ensure_partitions_is_noop_on_other_databases():
+    conn = _FakeConn("sqlite")
+    ensure_partitions(conn, date(2025, 1, 1), date(2025, 12, 31))
+    assert conn.statements == []
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from app.models import loader  # noqa: E402
+from app.optimizer import cheapest_slots, cheapest_window, hourly_series  # noqa: E402
+
+
+def test_cheapest_window_skips_missing_hours():
+    prices = [5.0, 1.0, None, 1.0, 1.0, 2.0, 9.0]
+    assert cheapest_window(prices, 2) == (3, 1.0)
+    assert cheapest_window(prices, 3) == (3, pytest.approx(4 / 3))
+    assert cheapest_window([None, None], 1) is None
+    assert cheapest_window(prices, 8) is None
+
+
+def test_cheapest_slots_are_sorted_by_time():
+    prices = [5.0, 1.0, None, 3.0, 0.5]
+    assert cheapest_slots(prices, 2) == ([1, 4], 0.75)
+    assert cheapest_slots(prices, 5) is None
+
+
+@pytest.fixture
+def weekday_prices(monkeypatch):
+    """Historikk der prisen er ukedagen (1 = mandag) i UTC, uten publiserte priser etter start."""
+    def fake_load_prices(db, area, start=None, end=None):
+        first = int(start.timestamp())
+        ts = np.arange(first, int(datetime(2025, 3, 10, 12, tzinfo=timezone.utc).timestamp()), 3600, dtype=np.int64)
+        prices = ((ts // 86400 + 3) % 7 + 1).astype(np.float64)
+        return ts, prices
+
+    monkeypatch.setattr(loader, "load_prices", fake_load_prices)
+
+
+def test_weekday_forecast_uses_each_days_weekday(weekday_prices):
+    # Mandag 12:00 + 36 timer: resten av mandagen og hele tirsdagen
+    start = datetime(2025, 3, 10, 12, tzinfo=timezone.utc)
+    series = hourly_series(None, ["NO1"], start, start + timedelta(hours=36), "baseline", "weekday")["NO1"]
+
+    assert len(series) == 36
+    assert {p[2] for p in series} == {"forecast"}
+    assert {p[1] for p in series if p[0].day == 10} == {1.0}
+    assert {p[1] for p in series if p[0].day == 11} == {2.0}
+
+
+def test_weekday_forecast_loads_four_weeks(weekday_prices, monkeypatch):
+    starts = []
+    fake = loader.load_prices
+    monkeypatch.setattr(loader, "load_prices", lambda db, area, start=None, end=None: (
+        starts.append(start) or fake(db, area, start, end)))
+
+    start = datetime(2025, 3, 10, 12, tzinfo=timezone.utc)
+    hourly_series(None, ["NO1"], start, start + timedelta(hours=12), "baseline", "weekday")
+    assert starts == [datetime(2025, 2, 10, tzinfo=timezone.utc)]
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models import pool
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """Tråder i stedet for prosesser, så testene kan styre jobbene med Events."""
+    executor = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(pool, "_get_executor", lambda: executor)
+    monkeypatch.setattr(pool, "TRAINING_WORKERS", 1)
+    monkeypatch.setattr(pool, "TRAINING_QUEUE_DEPTH", 1)
+    yield executor
+    executor.shutdown(wait=True)
+    pool._inflight.clear()
+
+
+def _wait_for_inflight(n: int) -> None:
+    # Done-callbacken som rydder _inflight kan kjøre litt etter at result() har returnert
+    deadline = time.monotonic() + 5
+    while len(pool._inflight) != n:
+        assert time.monotonic() < deadline, f"forventet {n} jobber i gang, fant {len(pool._inflight)}"
+        time.sleep(0.01)
+
+
+def test_identical_jobs_share_one_run(thread_pool):
+    release = threading.Event()
+    calls = []
+
+    def job(x):
+        calls.append(x)
+        release.wait(5)
+        return x * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.run_in_pool("key", job, 21))) for _ in range(3)]
+    threads[0].start()
+    _wait_for_inflight(1)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [21]
+    assert results == [42, 42, 42]
+    _wait_for_inflight(0)
+
+
+def test_full_queue_raises_pool_busy(thread_pool):
+    release = threading.Event()
+
+    def job():
+        release.wait(5)
+        return "ok"
+
+    # TRAINING_WORKERS + TRAINING_QUEUE_DEPTH = 2 jobber får plass
+    threads = [threading.Thread(target=pool.run_in_pool, args=(f"key-{i}", job)) for i in range(2)]
+    for t in threads:
+        t.start()
+    _wait_for_inflight(2)
+
+    with pytest.raises(pool.PoolBusy) as exc:
+        pool.run_in_pool("key-2", job)
+    assert exc.value.retry_after == pool.TRAINING_RETRY_AFTER
+
+    # En identisk jobb slipper inn selv om køen er full
+    joiner = threading.Thread(target=pool.run_in_pool, args=("key-0", job))
+    joiner.start()
+
+    release.set()
+    for t in threads + [joiner]:
+        t.join(5)
+    _wait_for_inflight(0)
+    assert pool.run_in_pool("key-2", job) == "ok"
+
+
+def test_errors_propagate_and_free_the_slot(thread_pool):
+    def boom():
+        raise ValueError("feil")
+
+    with pytest.raises(ValueError):
+        pool.run_in_pool("key", boom)
+    _wait_for_inflight(0)
+
+
+def test_warm_up_imports_modules_in_workers(thread_pool, monkeypatch):
+    monkeypatch.setattr(pool, "TRAINING_WORKERS", 3)
+    # Trådene deler prosess, så alle jobbene svarer med samme pid
+    assert pool.warm_up(["json", "app.models.registry"]) == 1
+    assert pool._inflight == {}
+
+    with pytest.raises(ModuleNotFoundError):
+        pool.warm_up(["finnes_ikke_modul"])
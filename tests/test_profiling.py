@@ -0,0 +1,61 @@
+import pytest
+
+from app import profiling
+from app.profiling import _profile_requested
+
+
+@pytest.fixture(autouse=True)
+def token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "hemmelig")
+
+
+def _scope(headers=(), query=b""):
+    return {"type": "http", "headers": list(headers), "query_string": query}
+
+
+def test_header_token():
+    assert _profile_requested(_scope([(b"x-profile", b"hemmelig")]))
+    assert not _profile_requested(_scope([(b"x-profile", b"feil")]))
+
+
+def test_query_token():
+    assert _profile_requested(_scope(query=b"areas=NO1&profile=hemmelig"))
+    assert not _profile_requested(_scope(query=b"profile=feil"))
+
+
+def test_non_ascii_token_is_rejected_not_an_error():
+    assert not _profile_requested(_scope([(b"x-profile", "blåbær".encode("latin-1"))]))
+    assert not _profile_requested(_scope(query=b"profile=%C3%A6%C3%B8%C3%A5"))
+    assert not _profile_requested(_scope(query=b"profile=\xe6\xf8"))
+
+
+def test_no_token():
+    assert not _profile_requested(_scope([(b"accept", b"*/*")], b"areas=NO1"))
+
+
+def test_parallel_tasks_merge_by_longest_phase():
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.profiling import Timings, record, record_parallel, run_with, start_timings
+
+    def task(seconds):
+        record("predict", seconds)
+        return seconds
+
+    def request():
+        timings = start_timings()
+        record("query", 0.5)
+        parts = [Timings() for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, run_with, t, task, s)
+                for t, s in zip(parts, (1.0, 2.0, 3.0, 4.0))
+            ]
+            assert [f.result() for f in futures] == [1.0, 2.0, 3.0, 4.0]
+        # Oppgavene skriver ikke i forespørselens Timings
+        assert timings.phases == {"query": 0.5}
+        record_parallel(parts)
+        return timings.phases
+
+    assert contextvars.copy_context().run(request) == {"query": 0.5, "predict": 4.0}
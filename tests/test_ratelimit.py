@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from app import ratelimit
+from app.ratelimit import MemoryBuckets, RateLimitMiddleware, client_key, parse_costs, request_cost, route_cost
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def test_cost_is_deducted_until_empty(clock):
+    buckets = MemoryBuckets(capacity=10, rate=1.0)
+    assert buckets.take("a", 4) == 0
+    assert buckets.take("a", 6) == 0
+    # Tom bøtte: 1 token trengs, fylles med 1 per sekund
+    assert buckets.take("a", 1) == 1
+    # Andre klienter har egen bøtte
+    assert buckets.take("b", 10) == 0
+
+
+def test_refill_over_time(clock):
+    buckets = MemoryBuckets(capacity=10, rate=2.0)
+    assert buckets.take("a", 10) == 0
+    assert buckets.take("a", 5) == 3  # ceil(5 / 2)
+
+    clock.now += 2.0
+    assert buckets.take("a", 5) == 1  # 4 tokens etter 2 sekunder
+    clock.now += 0.5
+    assert buckets.take("a", 5) == 0
+
+
+def test_refill_is_capped_at_capacity(clock):
+    buckets = MemoryBuckets(capacity=10, rate=1.0)
+    assert buckets.take("a", 1) == 0
+    clock.now += 3600
+    assert buckets.take("a", 10) == 0
+    assert buckets.take("a", 1) == 1
+
+
+def test_denied_request_costs_nothing(clock):
+    buckets = MemoryBuckets(capacity=10, rate=1.0)
+    assert buckets.take("a", 8) == 0
+    assert buckets.take("a", 5) == 3
+    assert buckets.take("a", 2) == 0
+
+
+def test_retry_after_is_at_least_one_second(clock):
+    buckets = MemoryBuckets(capacity=10, rate=100.0)
+    assert buckets.take("a", 10) == 0
+    assert buckets.take("a", 1) == 1
+
+
+def test_idle_buckets_are_pruned(clock):
+    buckets = MemoryBuckets(capacity=10, rate=1.0)
+    buckets.take("a", 1)
+    clock.now += 11
+    buckets.take("b", 1)
+    assert set(buckets._buckets) == {"b"}
+
+
+def test_route_cost_uses_longest_prefix():
+    assert route_cost("/api/forecast/baseline") == 2
+    assert route_cost("/api/forecast/xgboost") == 10
+    assert route_cost("/api/health") == 0
+    assert route_cost("/spot/latest") == 1
+
+
+def test_optimize_is_charged_for_its_model():
+    assert request_cost("/api/optimize/cheapest", b"area=NO1&duration=2") == 2
+    assert request_cost("/api/optimize/cheapest", b"model=baseline&variant=ewm") == 2
+    assert request_cost("/api/optimize/cheapest", b"model=xgboost&area=all") == 10
+    assert request_cost("/api/optimize/cheapest", b"model=baseline&model=xgboost") == 10
+    # Andre ruter bryr seg ikke om model
+    assert request_cost("/api/compare", b"model=xgboost") == 20
+    assert request_cost("/spot", b"model=xgboost") == 1
+
+
+def test_parse_costs():
+    assert parse_costs("/api/evaluate/=30, /spot=0.5,") == {"/api/evaluate/": 30.0, "/spot": 0.5}
+    assert parse_costs("") == {}
+    with pytest.raises(ValueError):
+        parse_costs("/spot=mye")
+
+
+def test_client_key(monkeypatch):
+    # Klienten sendte "6.6.6.6"; proxyen la til klientens egentlige adresse 1.2.3.4
+    scope = {"client": ("10.0.0.1", 1234), "headers": [(b"x-forwarded-for", b"6.6.6.6, 1.2.3.4")]}
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 0)
+    assert client_key(scope) == "10.0.0.1"
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 1)
+    assert client_key(scope) == "1.2.3.4"
+    assert client_key({}) == "unknown"
+
+
+def test_client_key_with_several_proxies(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 2)
+    scope = {"client": ("10.0.0.1", 1), "headers": [
+        (b"x-forwarded-for", b"6.6.6.6, 1.2.3.4"),
+        (b"x-forwarded-for", b"10.0.0.9"),
+    ]}
+    assert client_key(scope) == "1.2.3.4"
+    # Færre adresser enn proxyer: headeren er ikke satt av våre proxyer
+    assert client_key({"client": ("10.0.0.1", 1), "headers": [(b"x-forwarded-for", b"1.2.3.4")]}) == "10.0.0.1"
+
+
+def test_spoofed_forwarded_for_shares_one_bucket(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 1)
+    buckets = MemoryBuckets(capacity=10, rate=1.0)
+    results = [
+        buckets.take(client_key({"headers": [(b"x-forwarded-for", f"6.6.6.{i}, 1.2.3.4".encode())]}), 5)
+        for i in range(3)
+    ]
+    assert results == [0, 0, 5]
+
+
+def test_middleware_answers_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_CAPACITY", 20.0)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_REFILL", 1.0)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    middleware = RateLimitMiddleware(app, engine=None)
+    scope = {"type": "http", "method": "GET", "path": "/api/compare", "client": ("10.0.0.1", 1), "headers": []}
+
+    def call():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware(scope, None, send))
+        return sent[0]
+
+    assert call()["status"] == 200
+    denied = call()
+    assert denied["status"] == 429
+    assert (b"retry-after", b"20") in denied["headers"]
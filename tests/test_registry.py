@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+from app.models import registry
+from app.models.registry import ModelSpec, get_model, list_models, register, warm_up
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    module = types.ModuleType("fake_model")
+    module.forecast = lambda db, area: [{"area": area}]
+    module.evaluate = lambda db, area, day: {0: 1.0}
+    module.evaluate_arrays = lambda area, ts, prices, midnight: {0: 2.0}
+    monkeypatch.setitem(sys.modules, "fake_model", module)
+
+    spec = ModelSpec(
+        model_id="fake", name="Fake", description="", module="fake_model",
+        forecast="forecast", evaluate="evaluate", evaluate_arrays="evaluate_arrays", history_days=3,
+    )
+    monkeypatch.setitem(registry._registry, "fake", spec)
+    yield spec
+    registry._loaded.pop("fake_model", None)
+
+
+def test_builtin_models_are_registered():
+    assert {"baseline", "xgboost"} <= {spec.model_id for spec in list_models()}
+    assert get_model("baseline").history_days == 7
+
+
+def test_unknown_model_raises_value_error():
+    with pytest.raises(ValueError, match="Ukjent modell"):
+        get_model("finnes-ikke")
+
+
+def test_module_is_loaded_on_first_use(fake_model):
+    assert fake_model.info()["loaded"] is False
+    assert fake_model.forecast_fn()(None, "NO1") == [{"area": "NO1"}]
+    assert fake_model.evaluate_arrays_fn()("NO1", None, None, None) == {0: 2.0}
+    assert fake_model.info()["loaded"] is True
+    assert registry._loaded["fake_model"] is sys.modules["fake_model"]
+
+
+def test_warm_up_continues_after_failing_model(fake_model, monkeypatch, capsys):
+    broken = ModelSpec(
+        model_id="broken", name="Broken", description="", module="finnes_ikke_modul",
+        forecast="f", evaluate="e", evaluate_arrays="a", history_days=1,
+    )
+    monkeypatch.setitem(registry._registry, "broken", broken)
+
+    warm_up(["broken", "fake"])
+
+    out = capsys.readouterr().out
+    assert "broken: feil ved lasting" in out
+    assert fake_model.info()["loaded"] is True
+
+
+def test_warm_up_calls_prepare(fake_model, monkeypatch):
+    calls = []
+    sys.modules["fake_model"].prepare = lambda: calls.append("prepare")
+    monkeypatch.setitem(registry._registry, "fake", ModelSpec(**{**fake_model.__dict__, "prepare": "prepare"}))
+
+    warm_up(["fake"])
+    assert calls == ["prepare"]
+    assert get_model("xgboost").prepare == "warm_up_pool"
+
+
+def test_register_returns_spec(monkeypatch):
+    monkeypatch.setattr(registry, "_registry", {})
+    spec = ModelSpec("x", "X", "", "x", "f", "e", "a", 1)
+    assert register(spec) is spec
+    assert list_models() == [spec]
+
+
+def test_importing_registry_does_not_import_model_code():
+    code = "import sys, app.models.registry; print(any(m in sys.modules for m in ('numpy', 'app.models.baseline')))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert out.strip() == "False"
@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.serialization import rows_response  # noqa: E402
+
+KEYS = ("area", "date", "time_start", "nok_per_kwh")
+
+
+def test_utc_datetimes_use_z_suffix():
+    row = ("NO1", date(2026, 10, 19), datetime(2026, 10, 19, tzinfo=timezone.utc), 0.5)
+    body = rows_response(KEYS, [row]).body
+    assert b'"time_start":"2026-10-19T00:00:00Z"' in body
+    assert b'"date":"2026-10-19"' in body
+
+
+def test_naive_datetimes_are_utc():
+    row = ("NO1", date(2026, 10, 19), datetime(2026, 10, 19, 1), None)
+    assert orjson.loads(rows_response(KEYS, [row]).body)[0]["time_start"] == "2026-10-19T01:00:00Z"
+
+
+def test_other_offsets_are_kept():
+    cet = timezone(timedelta(hours=1))
+    row = ("NO1", date(2026, 10, 19), datetime(2026, 10, 19, tzinfo=cet), 0.5)
+    assert b"2026-10-19T00:00:00+01:00" in rows_response(KEYS, [row]).body
+
+
+def test_isoformat_response_matches_datetime_isoformat():
+    from app.serialization import IsoformatJSONResponse
+
+    aware = datetime(2026, 10, 19, 0, 0, 0, 123456, tzinfo=timezone.utc)
+    naive = datetime(2026, 10, 19, 1)
+    body = orjson.loads(rows_response(KEYS, [("NO1", date(2026, 10, 19), aware, 0.5),
+                                             ("NO1", date(2026, 10, 19), naive, 0.5)],
+                                      IsoformatJSONResponse).body)
+    assert [r["time_start"] for r in body] == [aware.isoformat(), naive.isoformat()]
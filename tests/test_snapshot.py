@@ -0,0 +1,63 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app import snapshot  # noqa: E402
+from app.snapshot import Snapshot  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_changes(monkeypatch):
+    monkeypatch.setattr(snapshot, "_changed", {})
+
+
+def _write(path, created=None):
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    ts = np.array([int((start + timedelta(hours=h)).timestamp()) for h in range(48)], dtype=np.int64)
+    series = {"NO1": (ts, np.arange(48, dtype=np.float64)), "NO2": (ts[:0], np.empty(0))}
+    snapshot.write(str(path), series, int(start.timestamp()), created)
+    return start
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "prices.snapshot"
+    start = _write(path)
+    snap = Snapshot(str(path))
+
+    ts, prices = snap.prices("NO1", start + timedelta(hours=24), start + timedelta(hours=26))
+    assert prices.tolist() == [24.0, 25.0]
+    assert ts[0] == int((start + timedelta(hours=24)).timestamp())
+    assert len(snap.prices("NO2", start)[0]) == 0
+    # Utenfor vinduet eller ukjent område går til databasen
+    assert snap.prices("NO1", start - timedelta(hours=1)) is None
+    assert snap.prices("NO5", start) is None
+
+
+def test_change_after_snapshot_falls_back_to_database(tmp_path):
+    path = tmp_path / "prices.snapshot"
+    start = _write(path, created=time.time() - 10)
+    snap = Snapshot(str(path))
+
+    snapshot.mark_changed("NO1", refresh=False)
+    assert snap.prices("NO1", start) is None
+
+    # Et snapshot lest etter endringen brukes igjen
+    _write(path)
+    assert Snapshot(str(path)).prices("NO1", start) is not None
+
+
+def test_change_for_all_areas(tmp_path):
+    path = tmp_path / "prices.snapshot"
+    start = _write(path, created=time.time() - 10)
+    snapshot.mark_changed(refresh=False)
+    assert Snapshot(str(path)).prices("NO2", start) is None
+
+
+def test_stale_snapshot_is_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "prices.snapshot"
+    start = _write(path, created=time.time() - 100)
+    monkeypatch.setattr(snapshot, "PRICE_SNAPSHOT_MAX_AGE", 50)
+    assert Snapshot(str(path)).prices("NO1", start) is None
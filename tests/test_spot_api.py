@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.models_db import SpotPrice  # noqa: E402
+from app.spot_api import _latest_rows  # noqa: E402
+
+
+def _add_hours(db, area: str, first: datetime, n: int) -> None:
+    for h in range(n):
+        ts = first + timedelta(hours=h)
+        db.add(SpotPrice(area=area, date=ts.date(), time_start=ts, time_end=ts + timedelta(hours=1),
+                         nok_per_kwh=float(h)))
+    db.commit()
+
+
+def test_latest_rows_returns_only_the_last_hours_per_area(db):
+    first = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    _add_hours(db, "NO1", first, 24 * 14)
+    _add_hours(db, "NO2", first, 24)
+
+    rows = _latest_rows(db, ["NO1", "NO2"], 3, None)
+
+    by_area = {a: [r for r in rows if r.area == a] for a in ("NO1", "NO2")}
+    assert [r.nok_per_kwh for r in by_area["NO1"]] == [24 * 14 - 3, 24 * 14 - 2, 24 * 14 - 1]
+    assert [r.nok_per_kwh for r in by_area["NO2"]] == [21, 22, 23]
+
+
+def test_latest_rows_respects_floor(db):
+    _add_hours(db, "NO1", datetime(2026, 10, 1, tzinfo=timezone.utc), 24)
+    assert _latest_rows(db, ["NO1"], 3, datetime(2026, 10, 5, tzinfo=timezone.utc)) == []
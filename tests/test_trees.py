@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.models.trees import from_model_json  # noqa: E402
+
+
+def _model(trees, base_score="[5E-1]", objective="reg:squarederror", num_feature="2"):
+    return {
+        "learner": {
+            "objective": {"name": objective},
+            "learner_model_param": {"base_score": base_score, "num_feature": num_feature},
+            "gradient_booster": {"name": "gbtree", "model": {"trees": trees}},
+        }
+    }
+
+
+# Tre 1: x0 < 0.5 -> 1.0, ellers x1 < 2.0 -> -1.0 / 3.0; NaN i x0 går til høyre, NaN i x1 til venstre
+_SPLIT = {
+    "left_children": [1, -1, 3, -1, -1],
+    "right_children": [2, -1, 4, -1, -1],
+    "split_indices": [0, 0, 1, 0, 0],
+    "split_conditions": [0.5, 1.0, 2.0, -1.0, 3.0],
+    "default_left": [0, 0, 1, 0, 0],
+}
+_LEAF = {
+    "left_children": [-1],
+    "right_children": [-1],
+    "split_indices": [0],
+    "split_conditions": [0.25],
+    "default_left": [0],
+}
+
+
+def test_handcrafted_model():
+    trees = from_model_json(_model([_SPLIT, _LEAF]))
+    assert trees.n_trees == 2
+    assert trees.depth == 2
+
+    X = np.array([
+        [0.0, 0.0],
+        [1.0, 1.0],
+        [1.0, 5.0],
+        [np.nan, 5.0],
+        [1.0, np.nan],
+        [0.5, 0.0],
+    ])
+    expected = np.array([1.75, -0.25, 3.75, 3.75, -0.25, -0.25], dtype=np.float32)
+    np.testing.assert_array_equal(trees.predict(X), expected)
+
+
+def test_rejects_wrong_shape_and_objective():
+    trees = from_model_json(_model([_LEAF]))
+    with pytest.raises(ValueError):
+        trees.predict(np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        from_model_json(_model([_LEAF], objective="reg:logistic"))
+
+
+def test_matches_xgboost_including_nan():
+    xgb = pytest.importorskip("xgboost")
+    from app.models.trees import from_booster
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 6))
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    X[rng.random(X.shape) < 0.1] = np.nan
+
+    model = xgb.XGBRegressor(n_estimators=50, max_depth=4, learning_rate=0.1, random_state=42)
+    model.fit(X, y)
+
+    X_test = rng.normal(size=(500, 6))
+    X_test[rng.random(X_test.shape) < 0.2] = np.nan
+    X_test[0] = np.nan
+
+    np.testing.assert_array_equal(from_booster(model).predict(X_test), model.predict(X_test))
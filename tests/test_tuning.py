@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from app.models.tuning import folds  # noqa: E402
+
+
+def test_folds_are_consecutive_blocks_at_the_end():
+    assert folds(100, 3, 10) == [(70, 80), (80, 90), (90, 100)]
+
+
+def test_first_fold_leaves_room_for_early_stopping_block():
+    # Første fold trenes på [0, first - val_size) og stopper tidlig på [first - val_size, first)
+    assert folds(31, 1, 10) == [(21, 31)]
+    with pytest.raises(ValueError):
+        folds(30, 1, 10)
+
+
+def test_training_windows_cover_the_serving_window():
+    import numpy as np
+
+    from app.models.tuning import training_windows
+
+    ts = np.arange(0, 100 * 86400, 3600, dtype=np.int64)  # 100 dager, timesoppløsning
+    splits = folds(len(ts), 2, 24)
+    windows = training_windows(ts, splits, 60, 24)
+
+    for (train_start, train_end, val_end), split in zip(windows, splits):
+        assert (train_end, val_end) == split
+        assert ts[train_end] - ts[train_start] == 60 * 86400
+
+
+def test_training_windows_start_at_first_row_when_history_is_short():
+    import numpy as np
+
+    from app.models.tuning import training_windows
+
+    ts = np.arange(0, 10 * 86400, 3600, dtype=np.int64)
+    assert training_windows(ts, folds(len(ts), 1, 24), 60, 24)[0][0] == 0
+    with pytest.raises(ValueError):
+        training_windows(ts, folds(len(ts), 1, 24), 2, 24)